@@ -40,6 +40,7 @@ from autologging import logged, traced
 
 from p2654model.assembly.PathState import PathState
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Command import Command
 from p2654model.interface.RVF import RVF
 
 
@@ -62,10 +63,11 @@ class Assembly:
         self.__description = description
         self.client_interface = None
         self.host_interface = None
-        self.host_callbacks = {"LISTCB": self.__list_callbacks}
+        self.host_callbacks = Command.table({Command.LISTCB: self.__list_callbacks})  # indexed by command
         self.resp_callbacks = {}
         self.__path_state = PathState.INACTIVE
         self.__uid = None  # universal identifier as int
+        self.scheduler = None  # owning Scheduler, bound by its Topology (see get_scheduler())
         self.__pending = False
         self._breadth_next = None  # Reference to next 'brother' segment
         self._depth_ref = None
@@ -86,15 +88,16 @@ class Assembly:
     def __list_callbacks(self, rvf: RVF):
         if self.host_interface is None:
             raise SchedulerError("host_interface must be defined.")
-        cbs = self.host_callbacks.keys()
         msg = ""
         first = True
-        for c in cbs:
+        for c in Command:
+            if self.host_callbacks[c] is None:
+                continue
             if first:
-                msg = c
+                msg = c.name
                 first = False
             else:
-                msg = msg + ", " + c
+                msg = msg + ", " + c.name
         rvf.payload = msg
         seg = self.depth()
         while seg is not None:
@@ -103,6 +106,16 @@ class Assembly:
                 break
             seg = seg.breadth()
 
+    def get_scheduler(self):
+        '''
+        Return the Scheduler that owns this assembly.  Assemblies not registered with the
+        Topology of a Scheduler fall back to the process wide SchedulerFactory instance.
+        '''
+        if self.scheduler is not None:
+            return self.scheduler
+        from p2654model.scheduler.Scheduler import SchedulerFactory
+        return SchedulerFactory.get_scheduler()
+
     def set_client_interface(self, client):
         self.client_interface = client
         self.client_interface.set_resp_callback(self.uid, self.resp_handler)
@@ -112,10 +125,10 @@ class Assembly:
         self.host_interface.set_req_callback(self.uid, self.hcb_handler)
 
     def hcb_handler(self, rvf: RVF):
-        cb = self.host_callbacks[rvf.command]
+        cb = Command.lookup(self.host_callbacks, rvf.command)
         if cb is None:
-            raise SchedulerError("Unidentified callback command has been called {:s}.".format(rvf.command))
-        self.logger.debug("hcb_handler({:s})\t{:s}\n".format(rvf.command, str(cb)))
+            raise SchedulerError("Unidentified callback command has been called {:s}.".format(str(rvf.command)))
+        self.logger.debug("hcb_handler(%s)\t%s\n", rvf.command, cb)
         cb(rvf)
 
     def resp_handler(self, rvf: RVF):
@@ -125,8 +138,21 @@ class Assembly:
             self.response_cv.notify()
             self.response_mutex.release()
 
+    def apply_children(self):
+        """
+        Apply the children of this assembly.  During a scheduler cycle only the children
+        on the path of a pending assembly are visited.
+        """
+        apply_path = self.get_scheduler().apply_path
+        seg = self.depth()
+        while seg is not None:
+            if apply_path is None or seg.uid in apply_path:
+                seg.apply()
+            seg = seg.breadth()
+
     def hcb_update(self, cb):
-        self.host_callbacks.update(cb)
+        for command, f in cb.items():
+            self.host_callbacks[command] = f
 
     def depth(self):
         return self._depth_ref
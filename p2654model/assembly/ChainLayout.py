@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+    Compiled layout of the segments of a scan chain.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Compiled layout of the segments of a scan chain.
+    Used by JTAGNetwork and IJTAGNetwork to find the segment of a child by uid, and to join
+    the segments into one scan vector or split a capture back into segments, using bit
+    offsets computed once per distinct set of segment widths.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from p2654model.interface.BitVector import BitVector
+from p2654model.interface.PackedBitVector import PackedBitVector
+
+
+class ChainLayout:
+    # Maximum number of distinct width combinations whose offsets are kept
+    max_layouts = 64
+
+    def __init__(self, first):
+        '''
+        Compile the chain made of first and its breadth siblings.  The first segment occupies
+        the most significant bits of the scan vector.
+        '''
+        self.children = []
+        seg = first
+        while seg is not None:
+            self.children.append(seg)
+            seg = seg.breadth()
+        self.index = {seg.uid: i for i, seg in enumerate(self.children)}  # uid -> segment index
+        self.__shifts = {}  # tuple of segment widths -> (total width, shift of every segment)
+
+    def __len__(self):
+        return len(self.children)
+
+    def shifts(self, widths):
+        '''
+        Return the total width and the shift (offset of the least significant bit) of every
+        segment of a scan made of segments of the given widths.
+        '''
+        entry = self.__shifts.get(widths)
+        if entry is None:
+            shifts = [0] * len(widths)
+            offset = 0
+            for i in range(len(widths) - 1, -1, -1):
+                shifts[i] = offset
+                offset += widths[i]
+            entry = (offset, shifts)
+            if len(self.__shifts) >= ChainLayout.max_layouts:
+                self.__shifts.clear()
+            self.__shifts[widths] = entry
+        return entry
+
+    def join(self, segments):
+        '''
+        Return the scan vector made of segments and the widths of the segments.
+        '''
+        widths = tuple(v.width for v in segments)
+        if any(isinstance(v, PackedBitVector) for v in segments):
+            # Long registers stay packed up to the controller buffer
+            return PackedBitVector.concat(*segments), widths
+        total, shifts = self.shifts(widths)
+        value = 0
+        for v, shift in zip(segments, shifts):
+            if v.value:
+                value |= v.value << shift
+        return BitVector(value, total), widths
+
+    def split(self, vector, widths, i):
+        '''
+        Return segment i of vector, a scan made of segments of the given widths.
+        '''
+        shift = self.shifts(widths)[1][i]
+        if isinstance(vector, PackedBitVector):
+            return vector.extract(shift, widths[i])
+        return BitVector(vector.value >> shift, widths[i])
@@ -37,8 +37,8 @@ from autologging import traced, logged
 
 from p2654model.assembly.LinkerAssembly import LinkerAssembly
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Command import Command, access_commands
 from p2654model.interface.RVF import RVF
-from p2654model.scheduler.Scheduler import SchedulerFactory
 
 
 # create logger
@@ -59,8 +59,8 @@ class DataMux(LinkerAssembly):
         self.pending_count = 0
         LinkerAssembly.__init__(self, name, description, DataMux.depth_next)
         self.visible = False
-        cb = {"ISACTIVE": self.hcb_isactive, "WRITE": self.hcb_write, "READ": self.hcb_read,
-              "WRITE_READ": self.hcb_write_read, "ADDRESS": self.hcb_address}
+        cb = {Command.ISACTIVE: self.hcb_isactive, Command.WRITE: self.hcb_write, Command.READ: self.hcb_read,
+              Command.WRITE_READ: self.hcb_write_read, Command.ADDRESS: self.hcb_address}
         self.hcb_update(cb)
 
     def set_keyreg(self, reg):
@@ -70,10 +70,9 @@ class DataMux(LinkerAssembly):
         return self.keyreg
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("DataMux.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                        str(rvf.payload)))
+        self.logger.debug("DataMux.resp_handler(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
-        resp = RVF()
+        resp = RVF.acquire()
         self.response_mutex.acquire()
         resp.payload = rvf.payload
         resp.command = rvf.command
@@ -92,19 +91,14 @@ class DataMux(LinkerAssembly):
         self.request_count -= 1
         if self.request_count == 0:
             pass  # Notify all requests have been satisfied
-        SchedulerFactory.get_scheduler().clear_pending()
+        self.get_scheduler().clear_pending()
 
     def apply(self):
         if self.keyreg is None:
             raise SchedulerError("keyreg must be defined before use.")
         # self.capture = False
         self.pending_count = 0
-        seg = self.depth()
-        while seg is not None:
-            seg.apply()
-            seg = seg.breadth()
-        if self.pending_count > 1:
-            raise SchedulerError("Multiple competing paths detected.")
+        # The selected segment must be known before the children post their requests
         try:
             self.selected_seg = self.description.get_addr_dr(self.keyreg.get_value())
         except SchedulerError:
@@ -113,16 +107,14 @@ class DataMux(LinkerAssembly):
             self.selected_seg = self.description.get_addr_dr(self.description.get_default_code())
         if self.selected_seg is None:
             raise SchedulerError("No path has been selected.")
+        self.apply_children()
+        if self.pending_count > 1:
+            raise SchedulerError("Multiple competing paths detected.")
         if self.pending:
-            self.logger.debug("selected_seg.name = {:s}.".format(self.selected_seg.name))
+            self.logger.debug("selected_seg.name = %s.", self.selected_seg.name)
             wrvf = RVF()
-            if self.capture and not self.update:
-                wrvf.command = "READ"
-            elif self.capture and self.update:
-                wrvf.command = "WRITE_READ"
-            elif self.update and not self.capture:
-                wrvf.command = "WRITE"
-            else:
+            wrvf.command = access_commands.get((self.capture, self.update))
+            if wrvf.command is None:
                 raise SchedulerError("Invalid command state!")
             wrvf.uid = self.uid
             wrvf.payload = self.value
@@ -131,8 +123,7 @@ class DataMux(LinkerAssembly):
             self.pending = False
             self.capture = False
             self.update = False
-            self.logger.debug("DataMux.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                     str(wrvf.payload)))
+            self.logger.debug("DataMux.apply(uid=%d, command=%s, payload=%s)\n", wrvf.uid, wrvf.command, wrvf.payload)
 
     def _select(self, suid):
         if self.keyreg is None:
@@ -173,18 +164,18 @@ class DataMux(LinkerAssembly):
         uid = rvf.uid
         code = self.keyreg.read()
         seldr = self.description.get_addr_dr(code)
-        scheduler = SchedulerFactory.get_scheduler()
+        scheduler = self.get_scheduler()
         assembly = scheduler.topology.getAssembly(uid)
         if seldr is not None:
             if assembly.entity_name == seldr.entity_name:
-                self.__send_response(uid, "ISACTIVE", "FALSE")
+                self.__send_response(uid, Command.ISACTIVE, "FALSE")
             else:
-                self.__send_response(uid, "ISACTIVE", "TRUE")
+                self.__send_response(uid, Command.ISACTIVE, "TRUE")
         else:
-            self.__send_response(uid, "ISACTIVE", "FALSE")
+            self.__send_response(uid, Command.ISACTIVE, "FALSE")
 
     def __send_response(self, uid, command, payload):
-        resp = RVF()
+        resp = RVF.acquire()
         resp.payload = payload
         resp.command = command
         resp.uid = uid
@@ -192,7 +183,7 @@ class DataMux(LinkerAssembly):
         seg = self.depth()
         while seg is not None:
             if uid == seg.uid:
-                seg.client_interface.reponse(resp)
+                seg.client_interface.response(resp)
                 found = True
                 break
             seg = seg.breadth()
@@ -200,8 +191,7 @@ class DataMux(LinkerAssembly):
             raise SchedulerError("Unable to locate uid assembly.")
 
     def hcb_write(self, rvf: RVF):
-        self.logger.debug("DataMux.hcb_write(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("DataMux.hcb_write(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
         if uid != self.selected_seg.uid:
             if self.selected_seg.uid is not None:
@@ -214,14 +204,13 @@ class DataMux(LinkerAssembly):
         self.update = True
         self.pending_count += 1
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_read(self, rvf: RVF):
-        self.logger.debug("DataMux.hcb_read(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                       str(rvf.payload)))
+        self.logger.debug("DataMux.hcb_read(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
         if uid != self.selected_seg.uid:
-            if self.selected_uid is not None:
+            if self.selected_seg.uid is not None:
                 self._deselect(self.selected_seg.uid)
             self._select(uid)
         self.local_access_mutex.acquire()
@@ -231,11 +220,10 @@ class DataMux(LinkerAssembly):
         self.capture = True
         self.update = False
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_write_read(self, rvf: RVF):
-        self.logger.debug("DataMux.hcb_write_read(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("DataMux.hcb_write_read(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
         if uid != self.selected_seg.uid:
             if self.selected_seg.uid is not None:
@@ -248,11 +236,10 @@ class DataMux(LinkerAssembly):
         self.update = True
         self.pending_count += 1
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_address(self, rvf: RVF):
-        self.logger.debug("DataMux.hcb_address(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("DataMux.hcb_address(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         code = rvf.payload
         if len(code) != self.kreg.reg_len:
             raise SchedulerError("Address is invalid length!")
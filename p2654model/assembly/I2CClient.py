@@ -33,28 +33,25 @@ __version__ = "0.0.1"
 
 
 from p2654model.assembly.SuperAssembly import SuperAssembly
+from p2654model.interface.Command import Command
 from p2654model.interface.RVF import RVF
 
 
 class I2CClient(SuperAssembly):
     def __init(self, name, description):
         SuperAssembly.__init__(self, name, description)
-        cb = {"ADDRESS": self.hcb_address, "WRITE": self.hcb_write, "READ": self.hcb_read}
+        cb = {Command.ADDRESS: self.hcb_address, Command.WRITE: self.hcb_write, Command.READ: self.hcb_read}
         self.hcb_update(cb)
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("I2CClient.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("I2CClient.resp_handler(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
 
     def apply(self):
-        self.logger.debug("I2CClient.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                                str(wrvf.payload)))
+        self.logger.debug("I2CClient.apply(uid=%d, command=%s, payload=%s)\n", wrvf.uid, wrvf.command, wrvf.payload)
 
     def hcb_scan(self, rvf: RVF):
-        self.logger.debug("I2CClient.hcb_scan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("I2CClient.hcb_scan(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
 
     def hcb_capscan(self, rvf: RVF):
-        self.logger.debug("I2CClient.hcb_capscan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("I2CClient.hcb_capscan(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
 
@@ -33,12 +33,17 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+import weakref
+from collections import deque
+
 import logging
 from autologging import traced, logged
-from myhdl import intbv
 
 from p2654model.assembly.SuperAssembly import SuperAssembly
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.BitVector import BitVector
+from p2654model.interface.Command import Command
+from p2654model.interface.PackedBitVector import PackedBitVector
 from p2654model.interface.RVF import RVF
 
 
@@ -49,98 +54,144 @@ module_logger = logging.getLogger('P2654Model.assembly.JTAGControllerAssembly')
 @logged
 @traced
 class JTAGControllerAssembly(SuperAssembly):
+    # (scan of the IR, capture of the response) indexed by command
+    scans = Command.table({Command.SIR: (True, True), Command.SIRNC: (True, False),
+                           Command.SDR: (False, True), Command.SDRNC: (False, False)})
+    # (length, value) last shifted into the IR, by controller.  The IR belongs to the controller,
+    # so the assemblies sharing a controller share the value.  Unknown for a controller that
+    # cannot be weakly referenced, whose SIRNC are then always scanned.
+    ir_values = weakref.WeakKeyDictionary()
+
     def __init__(self, name, description, jtag_controller):
         self.logger = logging.getLogger('P2654Model.assembly.JTAGControllerAssembly.JTAGControllerAssembly')
         self.logger.info('Creating an instance of JTAGControllerAssembly')
         self.capture = False
         self.pending_count = 0
         self.pending = False
-        self.rvf = None
+        self.requests = deque()  # requests received since the last apply, in order
         self.jtag_controller = jtag_controller
+        # Scan through the ba_scan_ir()/ba_scan_dr() buffer methods of the controller when it has
+        # them, instead of formatting and parsing hex strings with scan_ir()/scan_dr()
+        self.bytes_native = True
         SuperAssembly.__init__(self, name, description)
-        cb = {"SIR": self.hcb_sir, "SIRNC": self.hcb_sirnc, "SDR": self.hcb_sdr, "SDRNC": self.hcb_sdrnc}
+        cb = {Command.SIR: self.hcb_sir, Command.SIRNC: self.hcb_sirnc, Command.SDR: self.hcb_sdr, Command.SDRNC: self.hcb_sdrnc}
         self.hcb_update(cb)
 
     def apply(self):
         self.capture = False
         self.pending_count = 0
-        seg = self.depth()
-        while seg is not None:
-            seg.apply()
-            seg = seg.breadth()
+        self.apply_children()
         if self.pending_count > 1:
             raise SchedulerError("Multiple competing paths detected.")
         if self.pending:
             self.local_access_mutex.acquire()
-            uid = self.rvf.uid
-            command = self.rvf.command
-            payload = self.rvf.payload
+            requests = list(self.requests)
+            self.requests.clear()
             self.pending = False
             self.local_access_mutex.release()
-            self.logger.debug("self.rvf.command = {:s}.\n".format(command))
-            if command == "SIR":
-                self.logger.debug("Calling scan_ir().")
-                tdo = self.jtag_controller.scan_ir(len(payload),
-                                                   str(payload))  # payload must be an intbv type
-                resp = RVF()
-                resp.command = "SIR"
-                resp.uid = uid
-                self.logger.debug("SIR tdo={:s}".format(tdo))
-                resp.payload = intbv(int(tdo, 16), _nrbits=len(payload))
-                self.host_interface.response(resp)
-            elif command == "SIRNC":
-                # fmt = "{:0" + "{:d}".format((len(self.rvf.payload) + 1) // 4) + "X}"
-                # print("fmt = {:s}\n".format(fmt))
-                # tdi = fmt.format(int(self.rvf.payload))
-                # tdi = "{0:0{1}X}".format(int(payload), (len(payload) + 1) // 4)
-                tdi = str(payload)
-                self.logger.debug("tdi = {:s}\n".format(tdi))
-                self.jtag_controller.scan_ir(len(payload), tdi)  # payload must be an intbv type
-                resp = RVF()
-                resp.command = "SIRNC"
-                resp.uid = self.rvf.uid
-                resp.payload = intbv(0)
-                self.host_interface.response(resp)
-            elif command == "SDR":
-                tdo = self.jtag_controller.scan_dr(len(payload),
-                                                   str(payload))  # payload must be an intbv type
-                resp = RVF()
-                resp.command = "SDR"
-                resp.uid = uid
-                self.logger.debug("SDR tdo={:s}".format(tdo))
-                resp.payload = intbv(int(tdo, 16), _nrbits=len(payload))
-                self.host_interface.response(resp)
-            elif command == "SDRNC":
-                self.jtag_controller.scan_dr(len(payload),
-                                             str(payload))  # payload must be an intbv type
-                resp = RVF()
-                resp.command = "SDRNC"
-                resp.uid = uid
-                resp.payload = intbv(0)
-                self.host_interface.response(resp)
+            for i in range(len(requests)):
+                rvf = requests[i]
+                if rvf.command == Command.SDRNC and i + 1 < len(requests) and self.__supersedes(requests[i + 1], rvf):
+                    # The next request updates the same DR, so this value would be overwritten unseen
+                    self.logger.debug("SDRNC for uid %d merged with the next update.\n", rvf.uid)
+                    self.__respond(rvf.uid, rvf.command, BitVector())
+                elif rvf.command == Command.SIRNC and self.ir_value == (len(rvf.payload), int(rvf.payload)):
+                    self.logger.debug("SIRNC for uid %d dropped, IR already holds the instruction.\n", rvf.uid)
+                    self.__respond(rvf.uid, rvf.command, BitVector())
+                else:
+                    self.__scan(rvf.uid, rvf.command, rvf.payload)
+
+    @property
+    def ir_value(self):
+        '''
+        (length, value) last shifted into the IR of the controller, None if unknown.
+        '''
+        try:
+            return JTAGControllerAssembly.ir_values.get(self.jtag_controller)
+        except TypeError:
+            return None
+
+    @ir_value.setter
+    def ir_value(self, value):
+        try:
+            if value is None:
+                JTAGControllerAssembly.ir_values.pop(self.jtag_controller, None)
+            else:
+                JTAGControllerAssembly.ir_values[self.jtag_controller] = value
+        except TypeError:
+            pass
+
+    def invalidate_ir(self):
+        '''
+        Forget the value held by the IR, e.g., after a TAP reset, so the next SIRNC is scanned.
+        '''
+        self.ir_value = None
+
+    @staticmethod
+    def __supersedes(nxt: RVF, rvf: RVF):
+        return nxt.command == Command.SDRNC and nxt.uid == rvf.uid and len(nxt.payload) == len(rvf.payload)
+
+    def __scan(self, uid, command, payload):
+        self.logger.debug("command = %s.\n", command)
+        entry = Command.lookup(JTAGControllerAssembly.scans, command)
+        if entry is None:
+            raise SchedulerError("Invalid command detected. ({:s})".format(str(command)))
+        ir, capture = entry
+        count = len(payload)
+        ba_scan = getattr(self.jtag_controller, "ba_scan_ir" if ir else "ba_scan_dr", None) \
+            if self.bytes_native else None
+        if ba_scan is not None:
+            # Controller buffers hold the first bits shifted in byte 0, i.e. little endian bytes
+            if isinstance(payload, PackedBitVector):
+                # A packed vector already is a controller buffer: no copy
+                tdo = ba_scan(payload.buffer(), count)
+                captured = PackedBitVector.from_buffer(tdo, count) if capture else None
             else:
-                raise SchedulerError("Invalid command detected. ({:s})".format(command))
+                tdo = ba_scan(int(payload).to_bytes((count + 7) // 8, "little"), count)
+                captured = BitVector(int.from_bytes(tdo, "little"), count) if capture else None
+        else:
+            scan = self.jtag_controller.scan_ir if ir else self.jtag_controller.scan_dr
+            tdo = scan(count, str(payload))  # str() of the payload is its hex value
+            captured = BitVector(int(tdo, 16), count) if capture else None
+        if ir:
+            self.ir_value = (count, int(payload))
+        if capture:
+            self.logger.debug("%s tdo=%s", command, captured)
+            self.__respond(uid, command, captured)
+        else:
+            self.__respond(uid, command, BitVector())
+
+    def __respond(self, uid, command, payload):
+        resp = RVF.acquire()
+        resp.command = command
+        resp.uid = uid
+        resp.payload = payload
+        self.host_interface.response(resp)
 
     def hcb_sir(self, rvf: RVF):
         self.local_access_mutex.acquire()
-        self.rvf = rvf
+        self.requests.append(rvf)
         self.pending = True
         self.local_access_mutex.release()
+        self.get_scheduler().mark_dirty(self.uid)
 
     def hcb_sirnc(self, rvf: RVF):
         self.local_access_mutex.acquire()
-        self.rvf = rvf
+        self.requests.append(rvf)
         self.pending = True
         self.local_access_mutex.release()
+        self.get_scheduler().mark_dirty(self.uid)
 
     def hcb_sdr(self, rvf: RVF):
         self.local_access_mutex.acquire()
-        self.rvf = rvf
+        self.requests.append(rvf)
         self.pending = True
         self.local_access_mutex.release()
+        self.get_scheduler().mark_dirty(self.uid)
 
     def hcb_sdrnc(self, rvf: RVF):
         self.local_access_mutex.acquire()
-        self.rvf = rvf
+        self.requests.append(rvf)
         self.pending = True
         self.local_access_mutex.release()
+        self.get_scheduler().mark_dirty(self.uid)
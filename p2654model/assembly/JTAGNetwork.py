@@ -32,17 +32,19 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+from collections import deque
 from enum import Enum
 
 import logging
 from autologging import traced, logged
-from myhdl import intbv, concat
 
+from p2654model.assembly.ChainLayout import ChainLayout
 from p2654model.assembly.SuperAssembly import SuperAssembly
 from p2654model.description.JTAGNetworkDescription import JTAGNetworkDescription
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.BitVector import BitVector
+from p2654model.interface.Command import Command, scan_commands
 from p2654model.interface.RVF import RVF
-from p2654model.scheduler.Scheduler import SchedulerFactory
 
 
 # create logger
@@ -58,6 +60,9 @@ class JTAGNetwork(SuperAssembly):
         self.__value = None  # current value of the register
         self.__read_value = None
         self.segments = None
+        self.layout = None  # ChainLayout of the children, compiled with the segments
+        self.requested = set()  # indexes of the segments with a request in the next scan
+        self.scanned = deque()  # (segment widths, requested indexes) of the scans waiting for a response
         self.cached = False
         self.capture = False
         self.responses = None
@@ -66,167 +71,133 @@ class JTAGNetwork(SuperAssembly):
         SuperAssembly.__init__(self, name, description)
         self.visible = False
         self.pending = False
-        cb = {"SIR": self.hcb_sir, "SIRNC": self.hcb_sirnc, "SDR": self.hcb_sdr, "SDRNC": self.hcb_sdrnc}
+        cb = {Command.SIR: self.hcb_sir, Command.SIRNC: self.hcb_sirnc, Command.SDR: self.hcb_sdr, Command.SDRNC: self.hcb_sdrnc}
         self.hcb_update(cb)
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("JTAGNetwork.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                            str(rvf.payload)))
+        self.logger.debug("JTAGNetwork.resp_handler(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
         self.response_mutex.acquire()
         self.response = rvf.payload
+        widths, requested = self.scanned.popleft()
         self.response_mutex.release()
-        i = 0
-        start = 0
-        end = 0
-        seg = self.depth()
-        while seg is not None:
-            end = len(self.segments[i]) + end
-            resp = RVF()
+        children = self.layout.children
+        for i in sorted(requested):
+            seg = children[i]
+            resp = RVF.acquire()
             resp.uid = seg.uid
-            resp.payload = intbv(self.response[start:end])
+            resp.payload = self.layout.split(self.response, widths, i)
             resp.command = rvf.command
-
-            seg.client_interface.response(rvf)
-            start = end
-            i += 1
-            seg = seg.breadth()
+            seg.client_interface.response(resp)
         self.request_count -= 1
         if self.request_count == 0:
-            self.response_cv.notify()  # Notify all requests have been satisfied
-        SchedulerFactory.get_scheduler().clear_pending()
-
-    def __subsegment_count(self):
-        seg_count = 0
-        seg = self.depth()
-        while seg is not None:
-            seg_count += 1
-            seg = seg.breadth()
-        return seg_count
+            pass  # Notify all requests have been satisfied
+        self.get_scheduler().clear_pending()
 
     def __init_segments(self):
-        scsize = self.__subsegment_count()
-        self.segments = []
-        for i in range(scsize):
-            self.segments.append(intbv(0))
+        # The children are compiled once, the first time the network is used
+        self.layout = ChainLayout(self.depth())
+        self.segments = [BitVector() for i in range(len(self.layout))]
+
+    def __idle_segments(self):
+        """
+        Refresh the segments of the children without a request in this scan so the
+        chain keeps its length.  A TAP shifts the value its current IR or DR already holds.
+        """
+        from p2654model.assembly.TAP import TAP
+        for i, seg in enumerate(self.layout.children):
+            if i not in self.requested and isinstance(seg, TAP):
+                self.segments[i] = seg.get_idle_value(self.data_mode)
+
+    def __fill_segment(self, rvf: RVF):
+        i = self.layout.index.get(rvf.uid)
+        if i is not None:
+            self.segments[i] = BitVector.of(rvf.payload)  # fill in the appropriate subsegment
+            self.requested.add(i)
 
     def apply(self):
-        self.capture = False
         if not self.cached:
             self.__init_segments()
             self.cached = True
-        seg = self.depth()
-        while seg is not None:
-            seg.apply()
-            seg = seg.breadth()
+        self.apply_children()
         if self.pending:
             if self.data_mode is None:
                 raise SchedulerError("Pending conflict with data_mode!")
+            self.local_access_mutex.acquire()
+            self.__idle_segments()
             # Concatenate vectors together into a single vector to scan
-            value = concat([v for v in self.segments])
+            value, widths = self.layout.join(self.segments)
             wrvf = RVF()
-            if self.capture and self.data_mode:
-                wrvf.command = "SDR"
-            elif self.capture and not self.data_mode:
-                wrvf.command = "SIR"
-            elif self.data_mode:
-                wrvf.command = "SDRNC"
-            elif not self.data_mode:
-                wrvf.command = "SIRNC"
-            else:
-                raise SchedulerError("Invalid data_mode detected.")
+            wrvf.command = scan_commands[(self.capture, self.data_mode)]
             wrvf.uid = self.uid
             wrvf.payload = value
-            self.client_interface.request(wrvf)
-            self.request_count += 1
+            self.scanned.append((widths, self.requested))
+            self.requested = set()
             self.pending = False
+            self.capture = False
             self.data_mode = None
-            self.logger.debug("JTAGNetwork.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                         str(wrvf.payload)))
+            self.local_access_mutex.release()
+            self.client_interface.request(wrvf)
+            self.request_count += 1
+            self.logger.debug("JTAGNetwork.apply(uid=%d, command=%s, payload=%s)\n",
+                              wrvf.uid, wrvf.command, wrvf.payload)
+
+    def __mark_pending(self):
+        # Requests from several segments are merged into a single scan
+        if not self.pending:
+            self.pending = True
+            self.get_scheduler().mark_pending(self.uid)
 
     def hcb_sirnc(self, rvf: RVF):
         if self.data_mode is not None and self.data_mode:
             raise SchedulerError("Conflict in scan mode!")
-        self.data_mode = False
+        self.logger.debug("JTAGNetwork.hcb_sirnc(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
+        self.local_access_mutex.acquire()
         if not self.cached:
             self.__init_segments()
             self.cached = True
-        self.pending = True
-        self.logger.debug("JTAGNetwork.hcb_sirnc(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                         str(rvf.payload)))
-        uid = rvf.uid
-        seg = self.depth()
-        i = 0
-        while seg is not None:
-            if seg.uid == uid:
-                self.segments[i] = rvf.payload  # fill in the appropriate subsegment with intbv value
-                break
-            seg = seg.breadth()
-            i += 1
+        self.__fill_segment(rvf)
         self.data_mode = False
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.__mark_pending()
+        self.local_access_mutex.release()
 
     def hcb_sir(self, rvf: RVF):
         if self.data_mode is not None and self.data_mode:
             raise SchedulerError("Conflict in scan mode!")
-        self.data_mode = False
+        self.logger.debug("JTAGNetwork.hcb_sir(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
+        self.local_access_mutex.acquire()
         if not self.cached:
             self.__init_segments()
             self.cached = True
-        self.pending = True
+        self.__fill_segment(rvf)
         self.capture = True
-        self.logger.debug("JTAGNetwork.hcb_sir(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                       str(rvf.payload)))
-        uid = rvf.uid
-        seg = self.depth()
-        i = 0
-        while seg is not None:
-            if seg.uid == uid:
-                self.segments[i] = rvf.payload  # fill in the appropriate subsegment with intbv value
-                break
-            seg = seg.breadth()
-            i += 1
         self.data_mode = False
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.__mark_pending()
+        self.local_access_mutex.release()
 
     def hcb_sdrnc(self, rvf: RVF):
         if self.data_mode is not None and not self.data_mode:
             raise SchedulerError("Conflict in scan mode!")
+        self.logger.debug("JTAGNetwork.hcb_sdrnc(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
+        self.local_access_mutex.acquire()
         if not self.cached:
             self.__init_segments()
             self.cached = True
-        self.pending = True
-        self.logger.debug("JTAGNetwork.hcb_sdrnc(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                         str(rvf.payload)))
-        uid = rvf.uid
-        seg = self.depth()
-        i = 0
-        while seg is not None:
-            if seg.uid == uid:
-                self.segments[i] = rvf.payload  # fill in the appropriate subsegment with intbv value
-                break
-            seg = seg.breadth()
-            i += 1
+        self.__fill_segment(rvf)
         self.data_mode = True
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.__mark_pending()
+        self.local_access_mutex.release()
 
     def hcb_sdr(self, rvf: RVF):
         if self.data_mode is not None and not self.data_mode:
             raise SchedulerError("Conflict in scan mode!")
+        self.logger.debug("JTAGNetwork.hcb_sdr(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
+        self.local_access_mutex.acquire()
         if not self.cached:
             self.__init_segments()
             self.cached = True
-        self.pending = True
+        self.__fill_segment(rvf)
         self.capture = True
-        self.logger.debug("JTAGNetwork.hcb_sdr(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                       str(rvf.payload)))
-        uid = rvf.uid
-        seg = self.depth()
-        i = 0
-        while seg is not None:
-            if seg.uid == uid:
-                self.segments[i] = rvf.payload  # fill in the appropriate subsegment with intbv value
-                break
-            seg = seg.breadth()
-            i += 1
         self.data_mode = True
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.__mark_pending()
+        self.local_access_mutex.release()
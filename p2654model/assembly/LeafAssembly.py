@@ -32,10 +32,14 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+import time
+
 import logging
 from autologging import traced, logged
 
 from p2654model.assembly.Assembly import Assembly
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.BitVector import BitVector
 
 
 # create logger
@@ -49,3 +53,42 @@ class LeafAssembly(Assembly):
         self.logger = logging.getLogger('P2654Model.assembly.LeafAssembly.LeafAssembly')
         self.logger.info('Creating an instance of LeafAssembly')
         Assembly.__init__(self, name, description, None)
+        self.shadow = False  # opt-in dedup of writes against the last value shifted in
+        self.shadow_value = None  # value last shifted into the register, None if unknown
+        self.read_timestamp = None  # time.monotonic() of the last capture, None if never captured
+        self.read_cycle = None  # scheduler cycle of the last capture, None if never captured
+
+    def enable_shadow(self, enable=True):
+        '''
+        Enable or disable dropping writes of the value last shifted into this register.
+        '''
+        self.shadow = enable
+        self.shadow_value = None
+
+    def invalidate_shadow(self):
+        '''
+        Forget the shadow value, e.g., after a reset of the hardware, so the next write is scanned.
+        '''
+        self.shadow_value = None
+
+    def read_stamp(self):
+        '''
+        Return the (timestamp, cycle) pair of the value returned by read().
+        '''
+        return self.read_timestamp, self.read_cycle
+
+    def _stamp_capture(self):
+        self.read_timestamp = time.monotonic()
+        self.read_cycle = self.get_scheduler().cycle_count
+
+    @staticmethod
+    def _coerce(value):
+        # Values are kept as BitVector; an intbv written by the application is converted once here
+        try:
+            return BitVector.of(value)
+        except TypeError:
+            raise SchedulerError("val is not of type BitVector or intbv.")
+
+    def _is_redundant(self, value):
+        # A write is redundant only when nothing else is queued for the register
+        return self.shadow and not self.pending and self.shadow_value is not None and self.shadow_value == value
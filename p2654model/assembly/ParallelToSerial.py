@@ -33,27 +33,29 @@ __version__ = "0.0.1"
 
 
 from p2654model.assembly.SuperAssembly import SuperAssembly
+from p2654model.interface.Command import Command
+from p2654model.interface.RVF import RVF
 
 
 class ParallelToSerial(SuperAssembly):
     def __init(self, name, description):
         SuperAssembly.__init__(self, name, description)
-        cb = {"SCAN": self.hcb_scan, "CAPSCAN": self.hcb_capscan}
+        cb = {Command.SCAN: self.hcb_scan, Command.CAPSCAN: self.hcb_capscan}
         self.hcb_update(cb)
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("ParallelToSerial.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("ParallelToSerial.resp_handler(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
 
     def apply(self):
-        self.logger.debug("ParallelToSerial.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                                str(wrvf.payload)))
+        self.logger.debug("ParallelToSerial.apply(uid=%d, command=%s, payload=%s)\n",
+                          wrvf.uid, wrvf.command, wrvf.payload)
 
     def hcb_scan(self, rvf: RVF):
-        self.logger.debug("ParallelToSerial.hcb_scan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("ParallelToSerial.hcb_scan(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
 
     def hcb_capscan(self, rvf: RVF):
-        self.logger.debug("ParallelToSerial.hcb_capscan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("ParallelToSerial.hcb_capscan(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
 
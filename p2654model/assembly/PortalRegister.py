@@ -42,6 +42,7 @@ from p2654model.assembly.DataRegister import DataRegister
 from p2654model.assembly.SuperAssembly import SuperAssembly
 from p2654model.description.PortalRegisterDescription import PortalRegisterDescription
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Command import Command, access_commands
 from p2654model.interface.RVF import RVF
 
 
@@ -52,6 +53,9 @@ module_logger = logging.getLogger('P2654Model.assembly.PortalRegister')
 @logged
 @traced
 class PortalRegister(SuperAssembly):
+    # Responses passed on to the client, indexed by command
+    forwards = Command.table({Command.WRITE: True, Command.READ: True, Command.WRITE_READ: True}, default=False)
+
     def __init__(self, name, description: PortalRegisterDescription, address: intbv):
         self.logger = logging.getLogger('P2654Model.assembly.PortalRegister.PortalRegister')
         self.logger.info('Creating an instance of PortalRegister')
@@ -62,49 +66,43 @@ class PortalRegister(SuperAssembly):
         self.current_uid = None
         self.pending = False
         SuperAssembly.__init__(self, name, description)
-        cb = {"WRITE": self.hcb_write, "READ": self.hcb_read, "WRITE_READ": self.hcb_write_read}
+        cb = {Command.WRITE: self.hcb_write, Command.READ: self.hcb_read, Command.WRITE_READ: self.hcb_write_read}
         self.hcb_update(cb)
 
     def get_address(self):
         return self.address
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("PortalRegister.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
-        resp = RVF()
+        self.logger.debug("PortalRegister.resp_handler(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
+        resp = RVF.acquire()
         self.local_access_mutex.acquire()
         resp.uid = self.current_uid
         self.local_access_mutex.release()
         resp.payload = rvf.payload
-        if rvf.command == "WRITE" or rvf.command == "READ" or rvf.command == "WRITE_READ":
-            resp.command = rvf.command
-        elif rvf.command == "ADDRESS":
+        if rvf.command == Command.ADDRESS:
             self.response_cv.notify()
+        elif Command.lookup(PortalRegister.forwards, rvf.command):
+            resp.command = rvf.command
         else:
             raise SchedulerError("Invalid command received.")
         self.host_interface.response(resp)
         self.request_count -= 1
         if self.request_count == 0:
             pass  # Notify all requests have been satisfied
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().clear_pending()
+        self.get_scheduler().clear_pending()
 
     def apply(self):
         if self.pending:
             arvf = RVF()
-            arvf.command = "ADDRESS"
+            arvf.command = Command.ADDRESS
             arvf.uid = self.uid
             arvf.payload = self.address
             self.client_interface.request(arvf)
             self.response_cv.wait()
             wrvf = RVF()
-            if self.capture and not self.update:
-                wrvf.command = "READ"
-            elif self.capture and self.update:
-                wrvf.command = "WRITE_READ"
-            elif self.update and not self.capture:
-                wrvf.command = "WRITE"
-            else:
+            wrvf.command = access_commands.get((self.capture, self.update))
+            if wrvf.command is None:
                 raise SchedulerError("Invalid command state!")
             wrvf.uid = self.uid
             self.local_access_mutex.acquire()
@@ -115,12 +113,12 @@ class PortalRegister(SuperAssembly):
             self.request_count += 1
             self.pending = False
             self.local_access_mutex.release()
-            self.logger.debug("PortalRegister.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                          str(wrvf.payload)))
+            self.logger.debug("PortalRegister.apply(uid=%d, command=%s, payload=%s)\n",
+                              wrvf.uid, wrvf.command, wrvf.payload)
 
     def hcb_write(self, rvf: RVF):
-        self.logger.debug("PortalRegister.hcb_write(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("PortalRegister.hcb_write(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
         self.local_access_mutex.acquire()
         self.rvf = rvf
         self.current_uid = rvf.uid
@@ -129,12 +127,11 @@ class PortalRegister(SuperAssembly):
         self.capture = False
         self.update = True
         self.pending_count += 1
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_read(self, rvf: RVF):
-        self.logger.debug("PortalRegister.hcb_read(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                       str(rvf.payload)))
+        self.logger.debug("PortalRegister.hcb_read(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
         self.local_access_mutex.acquire()
         self.rvf = rvf
         self.current_uid = rvf.uid
@@ -143,12 +140,11 @@ class PortalRegister(SuperAssembly):
         self.pending_count += 1
         self.capture = True
         self.update = False
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_write_read(self, rvf: RVF):
-        self.logger.debug("PortalRegister.hcb_write_read(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("PortalRegister.hcb_write_read(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
         self.local_access_mutex.acquire()
         self.rvf = rvf
         self.current_uid = rvf.uid
@@ -157,5 +153,4 @@ class PortalRegister(SuperAssembly):
         self.capture = True
         self.update = True
         self.pending_count += 1
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
@@ -37,8 +37,8 @@ from autologging import traced, logged
 
 from p2654model.assembly.LinkerAssembly import LinkerAssembly
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Command import Command
 from p2654model.interface.RVF import RVF
-from p2654model.scheduler.Scheduler import SchedulerFactory
 
 
 # create logger
@@ -58,17 +58,16 @@ class ScanMux(LinkerAssembly):
         self.pending_count = 0
         LinkerAssembly.__init__(self, name, description, ScanMux.depth_next)
         self.visible = False
-        cb = {"ISACTIVE": self.hcb_isactive, "SCAN": self.hcb_scan, "CAPSCAN": self.hcb_capscan}
+        cb = {Command.ISACTIVE: self.hcb_isactive, Command.SCAN: self.hcb_scan, Command.CAPSCAN: self.hcb_capscan}
         self.hcb_update(cb)
 
     def set_keyreg(self, reg):
         self.keyreg = reg
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("ScanMux.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                        str(rvf.payload)))
+        self.logger.debug("ScanMux.resp_handler(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
-        resp = RVF()
+        resp = RVF.acquire()
         self.response_mutex.acquire()
         resp.payload = rvf.payload
         resp.command = rvf.command
@@ -87,19 +86,14 @@ class ScanMux(LinkerAssembly):
         self.request_count -= 1
         if self.request_count == 0:
             pass  # Notify all requests have been satisfied
-        SchedulerFactory.get_scheduler().clear_pending()
+        self.get_scheduler().clear_pending()
 
     def apply(self):
         if self.keyreg is None:
             raise SchedulerError("keyreg must be defined before use.")
         # self.capture = False
         self.pending_count = 0
-        seg = self.depth()
-        while seg is not None:
-            seg.apply()
-            seg = seg.breadth()
-        if self.pending_count > 1:
-            raise SchedulerError("Multiple competing paths detected.")
+        # The selected segment must be known before the children post their requests
         try:
             self.selected_seg = self.description.get_ir_dr(self.keyreg.get_value())
         except SchedulerError:
@@ -108,22 +102,20 @@ class ScanMux(LinkerAssembly):
             self.selected_seg = self.description.get_ir_dr(self.description.get_default_code())
         if self.selected_seg is None:
             raise SchedulerError("No path has been selected.")
+        self.apply_children()
+        if self.pending_count > 1:
+            raise SchedulerError("Multiple competing paths detected.")
         if self.pending:
-            self.logger.debug("selected_seg.name = {:s}.".format(self.selected_seg.name))
-            if self.capture:
-                wrvf = RVF()
-                wrvf.command = "CAPSCAN"
-            else:
-                wrvf = RVF()
-                wrvf.command = "SCAN"
+            self.logger.debug("selected_seg.name = %s.", self.selected_seg.name)
+            wrvf = RVF()
+            wrvf.command = Command.CAPSCAN if self.capture else Command.SCAN
             wrvf.uid = self.uid
             wrvf.payload = self.value
             self.client_interface.request(wrvf)
             self.request_count += 1
             self.pending = False
             self.capture = False
-            self.logger.debug("ScanMux.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                     str(wrvf.payload)))
+            self.logger.debug("ScanMux.apply(uid=%d, command=%s, payload=%s)\n", wrvf.uid, wrvf.command, wrvf.payload)
 
     def _select(self, suid):
         if self.keyreg is None:
@@ -164,18 +156,18 @@ class ScanMux(LinkerAssembly):
         uid = rvf.uid
         code = self.keyreg.read()
         seldr = self.description.get_ir_dr(code)
-        scheduler = SchedulerFactory.get_scheduler()
+        scheduler = self.get_scheduler()
         assembly = scheduler.topology.getAssembly(uid)
         if seldr is not None:
             if assembly.entity_name == seldr.entity_name:
-                self.__send_response(uid, "ISACTIVE", "FALSE")
+                self.__send_response(uid, Command.ISACTIVE, "FALSE")
             else:
-                self.__send_response(uid, "ISACTIVE", "TRUE")
+                self.__send_response(uid, Command.ISACTIVE, "TRUE")
         else:
-            self.__send_response(uid, "ISACTIVE", "FALSE")
+            self.__send_response(uid, Command.ISACTIVE, "FALSE")
 
     def __send_response(self, uid, command, payload):
-        resp = RVF()
+        resp = RVF.acquire()
         resp.payload = payload
         resp.command = command
         resp.uid = uid
@@ -183,7 +175,7 @@ class ScanMux(LinkerAssembly):
         seg = self.depth()
         while seg is not None:
             if uid == seg.uid:
-                seg.client_interface.reponse(resp)
+                seg.client_interface.response(resp)
                 found = True
                 break
             seg = seg.breadth()
@@ -191,8 +183,7 @@ class ScanMux(LinkerAssembly):
             raise SchedulerError("Unable to locate uid assembly.")
 
     def hcb_scan(self, rvf: RVF):
-        self.logger.debug("ScanMux.hcb_scan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("ScanMux.hcb_scan(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
         if uid != self.selected_seg.uid:
             if self.selected_seg.uid is not None:
@@ -203,14 +194,13 @@ class ScanMux(LinkerAssembly):
         self.pending = True
         self.pending_count += 1
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_capscan(self, rvf: RVF):
-        self.logger.debug("ScanMux.hcb_capscan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                       str(rvf.payload)))
+        self.logger.debug("ScanMux.hcb_capscan(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
         if uid != self.selected_seg.uid:
-            if self.selected_uid is not None:
+            if self.selected_seg.uid is not None:
                 self._deselect(self.selected_seg.uid)
             self._select(uid)
         self.local_access_mutex.acquire()
@@ -219,4 +209,4 @@ class ScanMux(LinkerAssembly):
         self.pending_count += 1
         self.capture = True
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
@@ -36,11 +36,12 @@ from enum import Enum
 
 import logging
 from autologging import traced, logged
-from myhdl import intbv
 
 from p2654model.assembly.LeafAssembly import LeafAssembly
 from p2654model.description.ScanRegisterDescription import ScanRegisterDescription
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.BitVector import BitVector
+from p2654model.interface.Command import Command
 from p2654model.interface.RVF import RVF
 
 
@@ -56,64 +57,75 @@ class ScanRegister(LeafAssembly):
         READ_ONLY = 1,
         READ_WRITE = 2
 
+    # Whether a response carries a captured value, indexed by command
+    captures = Command.table({Command.SCAN: False, Command.CAPSCAN: True})
+
     def __init__(self, name, direction: Direction, description: ScanRegisterDescription):
         self.logger = logging.getLogger('P2654Model.assembly.ScanRegister.ScanRegister')
         self.logger.info('Creating an instance of ScanRegister')
         self.direction = direction
         self.capture = False
+        self.update = False  # the next scan shifts in a written value, not a refresh
         LeafAssembly.__init__(self, name, description)
-        self.__value = self.description.safe_value  # current value of the register
-        self.__read_value = self.description.safe_value
+        self.__value = BitVector.of(self.description.safe_value)  # current value of the register
+        self.__read_value = self.__value
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("ScanRegister.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
-        if rvf.command == "SCAN":
-            self.__read_value = None
-        elif rvf.command == "CAPSCAN":
+        self.logger.debug("ScanRegister.resp_handler(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
+        captured = Command.lookup(ScanRegister.captures, rvf.command)
+        if captured is None:
+            # What the register holds is no longer known
+            self.invalidate_shadow()
+            raise SchedulerError("Invalid command received.")
+        if captured:
             self.response_mutex.acquire()
             self.__read_value = rvf.payload
+            self._stamp_capture()
             self.response_mutex.release()
         else:
-            raise SchedulerError("Invalid command received.")
+            self.__read_value = None
         self.request_count -= 1
         if self.request_count == 0:
             pass  # Notify all requests have been satisfied
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().clear_pending()
+        self.get_scheduler().clear_pending()
 
     def apply(self):
         if self.pending:
             self.local_access_mutex.acquire()
-            if self.capture:
-                wrvf = RVF()
-                wrvf.command = "CAPSCAN"
-            else:
-                wrvf = RVF()
-                wrvf.command = "SCAN"
+            wrvf = RVF()
+            wrvf.command = Command.CAPSCAN if self.capture else Command.SCAN
             wrvf.uid = self.uid
             wrvf.payload = self.__value
+            if self.shadow and self.update:
+                self.shadow_value = self.__value
             self.client_interface.request(wrvf)
             self.request_count += 1
             self.pending = False
+            self.update = False
             self.local_access_mutex.release()
-            self.logger.debug("ScanRegister.apply(uid={:d}, command={:s}, payload={:s})\n".format(wrvf.uid, wrvf.command,
-                                                                                          str(wrvf.payload)))
+            self.logger.debug("ScanRegister.apply(uid=%d, command=%s, payload=%s)\n",
+                              wrvf.uid, wrvf.command, wrvf.payload)
 
     def write(self, value):
-        if not isinstance(value, intbv):
-            raise SchedulerError("val is not of type intbv.")
+        value = self._coerce(value)
         if len(value) != self.reg_length:
             raise SchedulerError("Size of value does not match register size.")
-        self.logger.debug("ScanRegister.write({:s})\n".format(str(value)))
+        self.logger.debug("ScanRegister.write(%s)\n", value)
         self.local_access_mutex.acquire()
+        if self._is_redundant(value):
+            self.local_access_mutex.release()
+            self.logger.debug("ScanRegister.write: value already in register, write dropped.\n")
+            return
+        queued = self.pending  # already counted by the scheduler
         self.__value = value
         self.__read_value = None
         self.pending = True
+        self.update = True
         self.capture = False
         self.local_access_mutex.release()
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().mark_pending()
+        if not queued:
+            self.get_scheduler().mark_pending(self.uid)
 
     def read(self):
         if self.__read_value is None:
@@ -122,22 +134,38 @@ class ScanRegister(LeafAssembly):
         return self.__read_value
 
     def write_read(self, value):
-        if not isinstance(value, intbv):
-            raise SchedulerError("val is not of type intbv.")
+        value = self._coerce(value)
         if len(value) != self.reg_length:
             raise SchedulerError("Size of value does not match register size.")
         self.local_access_mutex.acquire()
+        queued = self.pending  # already counted by the scheduler
         self.__value = value
         self.__read_value = None
         self.pending = True
+        self.update = True
         self.capture = True
         self.local_access_mutex.release()
-        self.logger.debug("ScanRegister.write_read({:s})\n".format(str(value)))
-        from p2654model.scheduler.Scheduler import SchedulerFactory
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.logger.debug("ScanRegister.write_read(%s)\n", value)
+        if not queued:
+            self.get_scheduler().mark_pending(self.uid)
         # self.__read_value = self.get_response()
         # return self.__read_value
 
+    def refresh(self):
+        '''
+        Request a capture of the register, shifting back the value it already holds.
+        '''
+        self.local_access_mutex.acquire()
+        queued = self.pending  # already counted by the scheduler
+        self.__read_value = None
+        self.shadow_value = None  # the next write is scanned whatever the capture shows
+        self.pending = True
+        self.capture = True
+        self.local_access_mutex.release()
+        self.logger.debug("ScanRegister.refresh()\n")
+        if not queued:
+            self.get_scheduler().mark_pending(self.uid)
+
     def get_value(self):
         return self.__value
 
@@ -37,8 +37,8 @@ from autologging import traced, logged
 
 from p2654model.assembly.LinkerAssembly import LinkerAssembly
 from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Command import Command
 from p2654model.interface.RVF import RVF
-from p2654model.scheduler.Scheduler import SchedulerFactory
 
 
 # create logger
@@ -48,6 +48,10 @@ module_logger = logging.getLogger('P2654Model.assembly.TAP')
 @logged
 @traced
 class TAP(LinkerAssembly):
+    # (response goes to the IR, command of the response) indexed by the command of the scan
+    responses = Command.table({Command.SIR: (True, Command.CAPSCAN), Command.SIRNC: (True, Command.SCAN),
+                               Command.SDR: (False, Command.CAPSCAN), Command.SDRNC: (False, Command.SCAN)})
+
     def __init__(self, name, description):
         self.logger = logging.getLogger('P2654Model.assembly.TAP.TAP')
         self.logger.info('Creating an instance of TAP')
@@ -56,47 +60,32 @@ class TAP(LinkerAssembly):
         self.value = None
         self.command = None
         LinkerAssembly.__init__(self, name, description, TAP.depth_next)
-        cb = {"SCAN": self.hcb_scan, "CAPSCAN": self.hcb_capscan}
+        cb = {Command.SCAN: self.hcb_scan, Command.CAPSCAN: self.hcb_capscan}
         self.hcb_update(cb)
 
     def resp_handler(self, rvf: RVF):
-        self.logger.debug("TAP.resp_handler(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                    str(rvf.payload)))
+        self.logger.debug("TAP.resp_handler(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         uid = rvf.uid
-        resp = RVF()
+        resp = RVF.acquire()
         self.response_mutex.acquire()
         resp.payload = rvf.payload
         self.response_mutex.release()
-        if rvf.command == "SIR":
-            resp.uid = self.depth().uid
-            resp.command = "CAPSCAN"
-            self.host_interface.response(resp)
-        elif rvf.command == "SIRNC":
-            resp.uid = self.depth().uid
-            resp.command = "SCAN"
-            self.host_interface.response(resp)
-        elif rvf.command == "SDR":
-            resp.uid = self.depth().breadth().uid
-            resp.command = "CAPSCAN"
-            self.host_interface.response(resp)
-        elif rvf.command == "SDRNC":
-            resp.uid = self.depth().breadth().uid
-            resp.command = "SCAN"
-            self.host_interface.response(resp)
-        else:
+        entry = Command.lookup(TAP.responses, rvf.command)
+        if entry is None:
             raise SchedulerError("Invalid command received.")
+        to_ir, resp.command = entry
+        # The IR is the first child of the TAP, the DR mux the second
+        resp.uid = self.depth().uid if to_ir else self.depth().breadth().uid
+        self.host_interface.response(resp)
         self.request_count -= 1
         if self.request_count == 0:
             pass  # Notify all requests have been satisfied
-        SchedulerFactory.get_scheduler().clear_pending()
+        self.get_scheduler().clear_pending()
 
     def apply(self):
         self.capture = False
         self.pending_count = 0
-        seg = self.depth()
-        while seg is not None:
-            seg.apply()
-            seg = seg.breadth()
+        self.apply_children()
         if self.pending_count > 1:
             raise SchedulerError("Multiple competing paths detected.")
         if self.pending:
@@ -113,33 +102,50 @@ class TAP(LinkerAssembly):
             self.pending = False
             self.local_access_mutex.release()
 
+    def get_idle_value(self, data_mode):
+        """
+        Value to shift through this TAP when it shares a scan chain with other TAPs
+        but has no request of its own: the current IR value or the value of the selected DR.
+        """
+        ir = self.depth()
+        if not data_mode:
+            return ir.get_value()
+        mux = ir.breadth()
+        # The mux may not have been applied since the IR last changed, so selected_seg can be
+        # stale: the IR value tells which DR is in the chain
+        try:
+            dr = mux.description.get_ir_dr(ir.get_value())
+        except SchedulerError:
+            dr = mux.selected_seg
+            if dr is None:
+                dr = mux.description.get_ir_dr(mux.description.get_default_code())
+        return dr.get_value()
+
     def hcb_scan(self, rvf: RVF):
         # if not self.pending:
-        self.logger.debug("TAP.hcb_scan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                str(rvf.payload)))
+        self.logger.debug("TAP.hcb_scan(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         self.local_access_mutex.acquire()
         self.pending_count += 1
         self.value = rvf.payload
         if rvf.uid == self.depth().uid:  # This rvf is from the IR register
-            self.command = "SIRNC"
+            self.command = Command.SIRNC
         else:
-            self.command = "SDRNC"
+            self.command = Command.SDRNC
         self.pending = True
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
 
     def hcb_capscan(self, rvf: RVF):
         # if not self.pending:
         self.local_access_mutex.acquire()
-        self.logger.debug("TAP.hcb_capscan(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                   str(rvf.payload)))
+        self.logger.debug("TAP.hcb_capscan(uid=%d, command=%s, payload=%s)\n", rvf.uid, rvf.command, rvf.payload)
         self.pending_count += 1
         self.value = rvf.payload
         if rvf.uid == self.depth().uid:  # This rvf is from the IR register
-            self.command = "SIR"
+            self.command = Command.SIR
         else:
-            self.command = "SDR"
+            self.command = Command.SDR
         self.pending = True
         self.capture = True
         self.local_access_mutex.release()
-        SchedulerFactory.get_scheduler().mark_pending()
+        self.get_scheduler().mark_pending(self.uid)
@@ -34,9 +34,10 @@ __version__ = "0.0.1"
 
 import logging
 from autologging import traced, logged
-from myhdl import intbv
 
 from p2654model.description.AssemblyDescription import AssemblyDescription
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.BitVector import BitVector
 
 
 # create logger
@@ -50,26 +51,48 @@ class DataMuxDescription(AssemblyDescription):
         self.logger = logging.getLogger('P2654Model.description.DataMuxDescription.DataMuxDescription')
         self.logger.info('Creating an instance of DataMuxDescription')
         self.__addr_length = addr_length
+        # Map keyed by the int value of the address code
         self.__addr_register_map = {}
+        self.__uid_code_map = None  # uid of a DR -> first code selecting it, as a BitVector
+        self.__default_code = None  # first code added, used to deselect
+        self.__drs = None
         AssemblyDescription.__init__(self, entity_name)
 
     def add_dr_register(self, addr_code, dr_register):
-        self.__addr_register_map.update({bin(addr_code): dr_register})
+        code = int(addr_code)
+        self.__addr_register_map[code] = dr_register
+        if self.__default_code is None:
+            self.__default_code = BitVector(code, self.__addr_length)
+        # Rebuilt on next use
+        self.__uid_code_map = None
+        self.__drs = None
 
     def get_addr_dr(self, code):
-        return self.__addr_register_map[bin(code)]
+        try:
+            return self.__addr_register_map[int(code)]
+        except KeyError:
+            raise SchedulerError("DataMuxDescription: no register selected by code {:s}.".format(str(code)))
 
     def get_drs(self):
-        return set(self.__addr_register_map.values())
+        drs = self.__drs
+        if drs is None:
+            drs = self.__drs = frozenset(self.__addr_register_map.values())
+        return drs
 
     def get_default_code(self):
-        code = list(self.__addr_register_map.keys())[0]
-        self.logger.debug("DataMuxDescription.get_default_code(): code = {:s}, self.__ir_length = {:d}, intbv(code, _nrbits=self.__addr_length) = {:s}\n".format(
-            str(code), self.__addr_length, str(intbv(str(code)[2:], _nrbits=self.__addr_length))))
-        return intbv(str(code)[2:], _nrbits=self.__addr_length)
+        return self.__default_code
 
     def get_first_match(self, uid):
+        # Built on first use, once the registers have their uid, and kept until a DR is added
+        uid_code_map = self.__uid_code_map
+        if uid_code_map is None:
+            uid_code_map = self.__index_uids()
+        return uid_code_map.get(uid)
+
+    def __index_uids(self):
+        uid_code_map = {}
         for k, v in self.__addr_register_map.items():
-            if v.uid == uid:
-                return intbv(k, _nrbits=self.__addr_length)
-        return None
+            if v.uid not in uid_code_map:
+                uid_code_map[v.uid] = BitVector(k, self.__addr_length)
+        self.__uid_code_map = uid_code_map
+        return uid_code_map
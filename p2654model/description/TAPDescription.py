@@ -36,6 +36,7 @@ import logging
 from autologging import traced, logged
 
 from p2654model.description.AssemblyDescription import AssemblyDescription
+from p2654model.error.SchedulerError import SchedulerError
 
 
 # create logger
@@ -49,20 +50,32 @@ class TAPDescription(AssemblyDescription):
         self.logger = logging.getLogger('P2654Model.description.TAPDescription.TAPDescription')
         self.logger.info('Creating an instance of TAPDescription')
         self.__ir_length = ir_length
-        self.__ir_str_intbv_map = {}
+        # Maps keyed by the int value of the instruction code
         self.__instruction_name_map = {}
         self.__instruction_register_map = {}
+        self.__drs = None
         AssemblyDescription.__init__(self, entity_name)
 
     def add_dr_register(self, ir_code, ir_name, dr_register):
-        self.__instruction_register_map.update({bin(ir_code): dr_register})
-        self.__instruction_name_map.update({bin(ir_code): ir_name})
+        code = int(ir_code)
+        self.__instruction_register_map[code] = dr_register
+        self.__instruction_name_map[code] = ir_name
+        self.__drs = None  # rebuilt on next use
 
     def get_ir_name(self, code):
-        return self.__instruction_name_map[bin(code)]
+        try:
+            return self.__instruction_name_map[int(code)]
+        except KeyError:
+            raise SchedulerError("TAPDescription: no instruction with code {:s}.".format(str(code)))
 
     def get_ir_dr(self, code):
-        return self.__instruction_register_map[bin(code)]
+        try:
+            return self.__instruction_register_map[int(code)]
+        except KeyError:
+            raise SchedulerError("TAPDescription: no register selected by code {:s}.".format(str(code)))
 
     def get_drs(self):
-        return set(self.__instruction_register_map.values())
+        drs = self.__drs
+        if drs is None:
+            drs = self.__drs = frozenset(self.__instruction_register_map.values())
+        return drs
@@ -32,12 +32,14 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
-from queue import Queue
-from threading import Thread, Event
+from collections import deque
+from threading import Event, Lock
 
 import logging
 from autologging import traced, logged
 
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Dispatcher import DispatcherFactory
 from p2654model.interface.RVF import RVF
 
 
@@ -48,51 +50,98 @@ module_logger = logging.getLogger('P2654Model.interface.AccessInterface')
 @logged
 @traced
 class AccessInterface:
-    stop_event = Event()
-
-    @staticmethod
-    def stop():
-        AccessInterface.stop_event.set()
+    # Default dispatch mode of new interfaces, see set_inline()
+    inline_default = False
+    # Default bound of the queues of new interfaces, see set_queue_limit()
+    maxsize_default = 0
+    block_default = True
 
     def __init__(self, protocol):
         self.logger = logging.getLogger('P2654Model.interface.AccessInterface.AccessInterface')
         self.logger.info('Creating an instance of AccessInterface')
-        self.reqQ = Queue(maxsize=0)
-        self.respQ = Queue(maxsize=0)
+        # Both queues are served by the shared dispatcher instead of threads of their own
+        self.dispatcher = DispatcherFactory.acquire()
+        dispatcher = self.dispatcher
+        self.reqQ = dispatcher.channel(self.__req_handler, AccessInterface.maxsize_default,
+                                       AccessInterface.block_default)
+        self.respQ = dispatcher.channel(self.__resp_handler, AccessInterface.maxsize_default,
+                                        AccessInterface.block_default)
         self.req_cb = None
         self.resp_cb = {}
-        self.current_uid = None
+        # uid of the client -> umids of its requests waiting for a response, oldest first.
+        # Responses are routed by uid, so any number of requests may be in flight at once.
+        self.outstanding = {}
+        self.outstanding_mutex = Lock()
         self.protocol = protocol
-        req = Thread(target=self.__req_handler)
-        req.setDaemon(True)
-        req.start()
-        resp = Thread(target=self.__resp_handler)
-        resp.setDaemon(True)
-        resp.start()
-
-    def __req_handler(self):
-        while not AccessInterface.stop_event.is_set():
-            if self.req_cb is not None:
-                rvf = self.reqQ.get(block=True, timeout=None)
-                self.current_uid = rvf.uid
-                self.logger.debug("AccessInterface: Dispatching Request(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid,
-                                                                                                               rvf.command,
-                                                                                                               str(rvf.payload)))
-                self.logger.debug("dump of req_cb\n{:s}\n".format(str(self.req_cb)))
-                self.req_cb(rvf)
-                self.reqQ.task_done()
-
-    def __resp_handler(self):
-        while not AccessInterface.stop_event.is_set():
-            if self.resp_cb is not None:
-                # if self.current_uid is None:
-                    # raise SchedulerError("Received an unrequested response for uid.")
-                rvf = self.respQ.get(block=True, timeout=None)
-                self.logger.debug("AccessInterface: Dispatching Response(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid,
-                                                                                                               rvf.command,
-                                                                                                               str(rvf.payload)))
-                self.resp_cb[self.current_uid](rvf)
-                self.respQ.task_done()
+        self.inline = AccessInterface.inline_default
+        # Set by close(): the interface drops the messages still queued for it
+        self.stop_event = Event()
+
+    def close(self):
+        '''
+        Stop dispatching messages through this interface.  Called by Scheduler.stop() for
+        every interface of its topology; the interfaces of other schedulers are not affected.
+        The shared dispatcher is stopped when its last interface is closed.
+        '''
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        DispatcherFactory.release(self.dispatcher)
+
+    def set_inline(self, inline=True):
+        '''
+        In inline mode, request() and response() call the registered callbacks directly on the
+        caller's thread instead of queueing the message for the dispatcher.
+        '''
+        self.inline = inline
+
+    def set_queue_limit(self, maxsize, block=True):
+        '''
+        Bound the request and response queues to maxsize messages (0 for no bound).
+        When a queue is full, request()/response() wait for room if block is True
+        or raise SchedulerError if block is False.
+        '''
+        self.reqQ.set_limit(maxsize, block)
+        self.respQ.set_limit(maxsize, block)
+
+    def queue_stats(self):
+        '''
+        Return the depth, high-water mark and wait-time counters of the request and response queues.
+        '''
+        return {"request": self.reqQ.stats(), "response": self.respQ.stats()}
+
+    def __req_handler(self, rvf: RVF):
+        if self.stop_event.is_set():
+            return
+        self.logger.debug("AccessInterface: Dispatching Request(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
+        self.logger.debug("dump of req_cb\n%s\n", self.req_cb)
+        self.req_cb(rvf)
+
+    def __resp_handler(self, rvf: RVF):
+        if self.stop_event.is_set():
+            return
+        self.logger.debug("AccessInterface: Dispatching Response(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
+        # Responses are addressed to the uid of the client that is to receive them
+        cb = self.resp_cb.get(rvf.uid)
+        if cb is None:
+            raise SchedulerError("AccessInterface: No client registered for response to uid {:d}.".format(rvf.uid))
+        cb(rvf)
+        # The client keeps the payload, not the message, so it can be recycled
+        RVF.release(rvf)
+
+    def outstanding_count(self, uid=None):
+        '''
+        Number of requests of the client uid (of all clients if None) waiting for a response.
+        '''
+        self.outstanding_mutex.acquire()
+        if uid is None:
+            count = sum(len(q) for q in self.outstanding.values())
+        else:
+            count = len(self.outstanding.get(uid, ()))
+        self.outstanding_mutex.release()
+        return count
 
     def request(self, rvf: RVF):
         if rvf is None:
@@ -103,18 +152,62 @@ class AccessInterface:
             self.logger.debug("(((((((((((((((((((((((((((((((((rvf.command is None))))))))))))))))))))))))))))))))\n")
         if rvf.payload is None:
             self.logger.debug("(((((((((((((((((((((((((((((((((rvf.payload is None))))))))))))))))))))))))))))))))\n")
-        self.logger.debug("AccessInterface: Request(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                       str(rvf.payload)))
-        self.reqQ.put(rvf)
+        self.logger.debug("AccessInterface: Request(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
+        self.outstanding_mutex.acquire()
+        q = self.outstanding.get(rvf.uid)
+        if q is None:
+            q = deque()
+            self.outstanding[rvf.uid] = q
+        q.append(rvf.umid)
+        self.outstanding_mutex.release()
+        if self.inline:
+            self.__req_handler(rvf)
+        else:
+            try:
+                self.reqQ.put(rvf)
+            except SchedulerError:
+                # Rejected by a full queue: the request never went out
+                self.outstanding_mutex.acquire()
+                q.remove(rvf.umid)
+                self.outstanding_mutex.release()
+                raise
 
     def set_req_callback(self, uid, cb):
-        self.logger.debug("set_req_callback({:d}, {:s})\n".format(uid, str(cb)))
+        self.logger.debug("set_req_callback(%d, %s)\n", uid, cb)
         self.req_cb = cb
 
     def response(self, rvf: RVF):
-        self.logger.debug("AccessInterface: Response(uid={:d}, command={:s}, payload={:s})\n".format(rvf.uid, rvf.command,
-                                                                                            str(rvf.payload)))
-        self.respQ.put(rvf)
+        self.logger.debug("AccessInterface: Response(uid=%d, command=%s, payload=%s)\n",
+                          rvf.uid, rvf.command, rvf.payload)
+        # Once handed off, the message may be handled and recycled by a dispatcher worker
+        uid = rvf.uid
+        umid = self.__answered(uid)
+        if self.inline:
+            self.__resp_handler(rvf)
+        else:
+            try:
+                self.respQ.put(rvf)
+            except SchedulerError:
+                # Rejected by a full queue: the request stays outstanding
+                if umid is not None:
+                    self.outstanding_mutex.acquire()
+                    self.outstanding[uid].appendleft(umid)
+                    self.outstanding_mutex.release()
+                raise
+
+    def __answered(self, uid):
+        '''
+        Settle the oldest outstanding request of uid and return its umid, None if there is none.
+        '''
+        self.outstanding_mutex.acquire()
+        q = self.outstanding.get(uid)
+        # Responses to the requests of one client come back in order
+        umid = q.popleft() if q else None
+        self.outstanding_mutex.release()
+        if umid is None:
+            self.logger.debug("AccessInterface: Response to uid %d without an outstanding request.\n", uid)
+        return umid
 
     def set_resp_callback(self, uid, cb):
         self.resp_cb.update({uid: cb})
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+    Fixed width bit vector used for the register values and scan payloads.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Fixed width bit vector used for the register values and scan payloads.
+    A BitVector is an immutable pair of a non negative int and a width in bits.  It mirrors the
+    parts of myhdl.intbv used by the model (len(), int(), slicing, concatenation, comparison and
+    hex str()) at a fraction of the cost, and converts to and from bytes.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import operator
+
+
+class BitVector:
+    __slots__ = ("value", "width")
+
+    def __init__(self, value=0, width=None):
+        '''
+        value is truncated to width bits.  Without a width, the vector is as wide as value.
+        '''
+        if width is None:
+            self.value = value
+            self.width = value.bit_length()
+        else:
+            self.value = value & ((1 << width) - 1)
+            self.width = width
+
+    @staticmethod
+    def of(value):
+        '''
+        Return value as a BitVector.  Objects supporting len() and int(), such as myhdl.intbv,
+        are converted with their own width.  Raises TypeError for anything else.
+        '''
+        if isinstance(value, BitVector):
+            return value
+        try:
+            return BitVector(operator.index(value), len(value))
+        except TypeError:
+            raise TypeError("Cannot convert {:s} to a BitVector.".format(type(value).__name__))
+
+    @staticmethod
+    def concat(*vectors):
+        '''
+        Concatenate vectors, the first one taking the most significant bits.
+        '''
+        value = 0
+        width = 0
+        for v in vectors:
+            value = (value << v.width) | v.value
+            width += v.width
+        bv = BitVector.__new__(BitVector)
+        bv.value = value
+        bv.width = width
+        return bv
+
+    @staticmethod
+    def from_bytes(data, width=None):
+        '''
+        Build a vector from big endian bytes, keeping the width least significant bits.
+        '''
+        return BitVector(int.from_bytes(data, "big"), len(data) * 8 if width is None else width)
+
+    def to_bytes(self):
+        '''
+        Big endian bytes holding the vector, the unused most significant bits being 0.
+        '''
+        return self.value.to_bytes((self.width + 7) // 8, "big")
+
+    def __len__(self):
+        return self.width
+
+    def __int__(self):
+        return self.value
+
+    def __index__(self):
+        return self.value
+
+    def __bool__(self):
+        return self.value != 0
+
+    def __getitem__(self, key):
+        # Same convention as intbv: v[hi:lo] holds bits hi-1 down to lo, v[i] is bit i
+        if isinstance(key, slice):
+            hi = self.width if key.start is None else key.start
+            lo = 0 if key.stop is None else key.stop
+            if key.step is not None or hi <= lo:
+                raise IndexError("Invalid slice [{:s}:{:s}] of a BitVector.".format(str(key.start), str(key.stop)))
+            return BitVector(self.value >> lo, hi - lo)
+        return bool((self.value >> key) & 1)
+
+    def __eq__(self, other):
+        # As with intbv, only the values are compared, not the widths
+        if isinstance(other, BitVector):
+            return self.value == other.value
+        try:
+            return self.value == operator.index(other)
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __invert__(self):
+        return BitVector(~self.value, self.width)
+
+    def __operand(self, other):
+        # Vectors keep their own width, plain ints take the width of this vector as in __eq__
+        if isinstance(other, BitVector):
+            return other
+        if isinstance(other, int):
+            return BitVector(other, self.width)
+        try:
+            return BitVector.of(other)
+        except TypeError:
+            return None
+
+    def __and__(self, other):
+        other = self.__operand(other)
+        if other is None:
+            return NotImplemented
+        return BitVector(self.value & other.value, max(self.width, other.width))
+
+    def __or__(self, other):
+        other = self.__operand(other)
+        if other is None:
+            return NotImplemented
+        return BitVector(self.value | other.value, max(self.width, other.width))
+
+    def __xor__(self, other):
+        other = self.__operand(other)
+        if other is None:
+            return NotImplemented
+        return BitVector(self.value ^ other.value, max(self.width, other.width))
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def __str__(self):
+        # Zero padded hex, as str() of an intbv
+        if self.width:
+            return "{:0{w}x}".format(self.value, w=(self.width - 1) // 4 + 1)
+        return "{:x}".format(self.value)
+
+    def __repr__(self):
+        return "BitVector(0x{:x}, {:d})".format(self.value, self.width)
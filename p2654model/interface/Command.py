@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+    Command codes carried by RVF messages.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Integer command codes carried by RVF messages and the tables used to dispatch on them.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from enum import IntEnum
+
+
+class Command(IntEnum):
+    LISTCB = 0
+    SCAN = 1
+    CAPSCAN = 2
+    SIR = 3
+    SIRNC = 4
+    SDR = 5
+    SDRNC = 6
+    READ = 7
+    WRITE = 8
+    WRITE_READ = 9
+    ADDRESS = 10
+    ISACTIVE = 11
+
+    def __str__(self):
+        return self.name
+
+    def __format__(self, format_spec):
+        # Commands are logged by name, e.g. "{:s}".format(rvf.command)
+        return format(self.name, format_spec)
+
+    @staticmethod
+    def table(entries: dict, default=None):
+        '''
+        Build a list indexed by command code from a dict of command -> entry.
+        '''
+        t = [default] * len(Command)
+        for command, entry in entries.items():
+            t[command] = entry
+        return t
+
+    @staticmethod
+    def lookup(table, command):
+        '''
+        Return the entry of command in a table built by table(), or None when command is not
+        a command code (e.g. None, a string or an out of range integer).
+        '''
+        if isinstance(command, int) and 0 <= command < len(table):
+            return table[command]
+        return None
+
+
+# Command of a scan request through a JTAG network, keyed by (capture, data_mode)
+scan_commands = {(True, True): Command.SDR, (True, False): Command.SIR,
+                 (False, True): Command.SDRNC, (False, False): Command.SIRNC}
+# Command of a request to a data register, keyed by (capture, update)
+access_commands = {(True, False): Command.READ, (True, True): Command.WRITE_READ,
+                   (False, True): Command.WRITE}
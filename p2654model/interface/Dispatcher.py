@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""
+    Shared dispatcher serving the message queues of all AccessInterface instances.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Shared dispatcher serving the message queues of all AccessInterface instances.
+    A fixed pool of worker threads serves every Channel, so the number of threads does
+    not grow with the size of the model.  Each Channel is served by a single worker at a
+    time, which keeps its messages in order.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import time
+from collections import deque
+from queue import Queue
+from threading import Condition, Lock, Thread, local
+
+import logging
+from autologging import traced, logged
+
+from p2654model.error.SchedulerError import SchedulerError
+
+
+# create logger
+module_logger = logging.getLogger('P2654Model.interface.Dispatcher')
+
+
+class DispatcherFactory:
+    inst = None
+    mutex = Lock()
+    # Number of open interfaces served by inst, see acquire() and release()
+    users = 0
+
+    @staticmethod
+    def get_dispatcher(workers=4):
+        DispatcherFactory.mutex.acquire()
+        if DispatcherFactory.inst is None:
+            DispatcherFactory.inst = Dispatcher(workers=workers)
+        DispatcherFactory.mutex.release()
+        return DispatcherFactory.inst
+
+    @staticmethod
+    def acquire(workers=4):
+        '''
+        Return the shared dispatcher and count one more interface using it.
+        '''
+        DispatcherFactory.mutex.acquire()
+        if DispatcherFactory.inst is None:
+            DispatcherFactory.inst = Dispatcher(workers=workers)
+        DispatcherFactory.users += 1
+        dispatcher = DispatcherFactory.inst
+        DispatcherFactory.mutex.release()
+        return dispatcher
+
+    @staticmethod
+    def release(dispatcher):
+        '''
+        Count one interface less using dispatcher.  The shared dispatcher is stopped once
+        the last interface using it has been closed.
+        '''
+        DispatcherFactory.mutex.acquire()
+        last = False
+        if dispatcher is DispatcherFactory.inst:
+            DispatcherFactory.users -= 1
+            last = DispatcherFactory.users <= 0
+            if last:
+                DispatcherFactory.inst = None
+                DispatcherFactory.users = 0
+        DispatcherFactory.mutex.release()
+        if last:
+            dispatcher.stop()
+
+    @staticmethod
+    def stop():
+        DispatcherFactory.mutex.acquire()
+        dispatcher = DispatcherFactory.inst
+        DispatcherFactory.inst = None
+        DispatcherFactory.users = 0
+        DispatcherFactory.mutex.release()
+        if dispatcher is not None:
+            dispatcher.stop()
+
+
+@logged
+@traced
+class Channel:
+    # Maximum number of messages handled before the worker is given back to the other channels
+    burst = 32
+
+    def __init__(self, dispatcher, handler, maxsize=0, block=True):
+        self.dispatcher = dispatcher
+        self.handler = handler
+        self.items = deque()  # (enqueue time, message)
+        self.mutex = Lock()
+        self.not_full = Condition(self.mutex)
+        self.scheduled = False  # True while the channel is waiting for or held by a worker
+        self.maxsize = maxsize  # 0 for an unbounded channel
+        self.block = block  # when full, put() blocks if True, raises SchedulerError if False
+        # Metrics
+        self.high_water = 0  # largest depth reached
+        self.dispatched = 0  # messages handled
+        self.wait_time = 0.0  # total seconds messages spent queued before being handled
+        self.blocked_time = 0.0  # total seconds producers spent blocked on a full channel
+        self.overflows = 0  # messages accepted over maxsize to avoid blocking a dispatcher worker
+
+    def put(self, item):
+        self.mutex.acquire()
+        if self.maxsize > 0 and len(self.items) >= self.maxsize:
+            if not self.block:
+                self.mutex.release()
+                raise SchedulerError("Channel: Queue is full ({:d} messages).".format(self.maxsize))
+            if self.dispatcher.in_worker():
+                # A worker waiting for room could be the one that has to make it
+                self.overflows += 1
+            else:
+                start = time.perf_counter()
+                while len(self.items) >= self.maxsize:
+                    self.not_full.wait()
+                self.blocked_time += time.perf_counter() - start
+        self.items.append((time.perf_counter(), item))
+        if len(self.items) > self.high_water:
+            self.high_water = len(self.items)
+        schedule = not self.scheduled
+        self.scheduled = True
+        self.mutex.release()
+        if schedule:
+            self.dispatcher.ready(self)
+
+    def qsize(self):
+        return len(self.items)
+
+    def set_limit(self, maxsize, block=True):
+        self.mutex.acquire()
+        self.maxsize = maxsize
+        self.block = block
+        self.not_full.notify_all()
+        self.mutex.release()
+
+    def stats(self):
+        '''
+        Return the depth and the counters of this channel as a dict.
+        '''
+        self.mutex.acquire()
+        stats = {"depth": len(self.items), "high_water": self.high_water, "dispatched": self.dispatched,
+                 "wait_time": self.wait_time, "blocked_time": self.blocked_time, "overflows": self.overflows}
+        self.mutex.release()
+        return stats
+
+    def run(self):
+        '''
+        Called by a worker thread to handle the messages of this channel in order.
+        '''
+        for i in range(Channel.burst):
+            self.mutex.acquire()
+            if len(self.items) == 0:
+                self.scheduled = False
+                self.mutex.release()
+                return
+            enqueued, item = self.items.popleft()
+            self.wait_time += time.perf_counter() - enqueued
+            self.dispatched += 1
+            self.not_full.notify()
+            self.mutex.release()
+            self.handler(item)
+        # Messages remain: go back to the end of the line so other channels are not starved
+        self.dispatcher.ready(self)
+
+
+@logged
+@traced
+class Dispatcher:
+    def __init__(self, workers=4):
+        self.logger = logging.getLogger('P2654Model.interface.Dispatcher.Dispatcher')
+        self.logger.info('Creating an instance of Dispatcher')
+        self.readyQ = Queue(maxsize=0)  # channels with messages to handle
+        self.local = local()  # marks the worker threads
+        self.workers = []
+        for i in range(workers):
+            t = Thread(target=self.__worker)
+            t.daemon = True
+            t.start()
+            self.workers.append(t)
+
+    def channel(self, handler, maxsize=0, block=True):
+        '''
+        Create a new channel whose messages are passed to handler by the workers of this dispatcher.
+        A channel with a maxsize holds at most maxsize messages; see Channel.put() for the backpressure.
+        '''
+        return Channel(self, handler, maxsize=maxsize, block=block)
+
+    def in_worker(self):
+        return getattr(self.local, "worker", False)
+
+    def ready(self, channel: Channel):
+        self.readyQ.put(channel)
+
+    def stop(self):
+        for t in self.workers:
+            self.readyQ.put(None)
+
+    def __worker(self):
+        self.local.worker = True
+        while True:
+            channel = self.readyQ.get(block=True, timeout=None)
+            if channel is None:
+                break
+            try:
+                channel.run()
+            except Exception as e:
+                self.logger.error("Dispatcher: Error while dispatching a message.\n%s\n", e)
+                # Keep serving the rest of the channel
+                channel.mutex.acquire()
+                channel.scheduled = False
+                schedule = len(channel.items) > 0
+                if schedule:
+                    channel.scheduled = True
+                channel.mutex.release()
+                if schedule:
+                    self.ready(channel)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+    Bit vector packed in a NumPy uint8 array, for very long registers.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Bit vector packed in a NumPy uint8 array, for very long registers.
+    The bytes are kept in the order of the buffers of the JTAG controllers (byte 0 holds bits
+    7..0, the first bits shifted), so a vector is handed to ba_scan_dr() and built from its
+    capture without copying.  Masking, inversion, bitwise operations, comparison and bit
+    reversal are vectorized.  NumPy is optional: it is only needed to create packed vectors.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.BitVector import BitVector
+
+
+class PackedBitVector(BitVector):
+    __slots__ = ("bits",)
+
+    def __init__(self, bits, width):
+        '''
+        bits is a uint8 array of (width + 7) // 8 bytes, least significant byte first.
+        Unused bits of the last byte must be 0.
+        '''
+        if np is None:
+            raise SchedulerError("PackedBitVector requires NumPy.")
+        self.bits = bits
+        self.width = width
+
+    @staticmethod
+    def from_buffer(buffer, width):
+        '''
+        Wrap the buffer returned by a JTAG controller scan, without copying it.
+        '''
+        if np is None:
+            raise SchedulerError("PackedBitVector requires NumPy.")
+        bits = np.frombuffer(buffer, dtype=np.uint8, count=(width + 7) // 8)
+        if width % 8 and bits[-1] >> (width % 8):
+            # Only copied when the controller left garbage above the last bit
+            bits = PackedBitVector.__mask(bits.copy(), width)
+        return PackedBitVector(bits, width)
+
+    @staticmethod
+    def from_int(value, width):
+        if np is None:
+            raise SchedulerError("PackedBitVector requires NumPy.")
+        data = (value & ((1 << width) - 1)).to_bytes((width + 7) // 8, "little")
+        return PackedBitVector(np.frombuffer(data, dtype=np.uint8), width)
+
+    @staticmethod
+    def of(value):
+        '''
+        Return value, a BitVector or an intbv, as a PackedBitVector.
+        '''
+        if isinstance(value, PackedBitVector):
+            return value
+        value = BitVector.of(value)
+        return PackedBitVector.from_int(value.value, value.width)
+
+    @staticmethod
+    def __mask(bits, width):
+        # Clear the unused bits of the last byte, in place
+        if width % 8:
+            bits[-1] &= (1 << (width % 8)) - 1
+        return bits
+
+    @property
+    def value(self):
+        return int.from_bytes(self.bits, "little")
+
+    def buffer(self):
+        '''
+        The bytes of the vector in controller order, as a view on the array (no copy).
+        '''
+        return memoryview(self.bits)
+
+    def to_bytes(self):
+        return self.bits[::-1].tobytes()
+
+    @staticmethod
+    def concat(*vectors):
+        '''
+        Concatenate vectors, the first one taking the most significant bits, without going
+        through Python ints.  Vectors that are not packed are packed first.
+        '''
+        flat = np.concatenate([np.unpackbits(PackedBitVector.of(v).bits, count=v.width, bitorder="little")
+                               for v in reversed(vectors)] + [np.zeros(0, dtype=np.uint8)])
+        return PackedBitVector(np.packbits(flat, bitorder="little"), len(flat))
+
+    def extract(self, shift, width):
+        '''
+        Return the width bits starting at bit shift, as a PackedBitVector.
+        '''
+        flat = np.unpackbits(self.bits, count=self.width, bitorder="little")
+        return PackedBitVector(np.packbits(flat[shift:shift + width], bitorder="little"), width)
+
+    def __eq__(self, other):
+        if isinstance(other, PackedBitVector) and len(other.bits) == len(self.bits):
+            return bool(np.array_equal(self.bits, other.bits))
+        return BitVector.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __invert__(self):
+        return PackedBitVector(PackedBitVector.__mask(np.invert(self.bits), self.width), self.width)
+
+    def __binary(self, other, op):
+        if isinstance(other, PackedBitVector) and other.width == self.width:
+            return PackedBitVector(op(self.bits, other.bits), self.width)
+        return None
+
+    def __and__(self, other):
+        r = self.__binary(other, np.bitwise_and)
+        return r if r is not None else BitVector.__and__(self, other)
+
+    def __or__(self, other):
+        r = self.__binary(other, np.bitwise_or)
+        return r if r is not None else BitVector.__or__(self, other)
+
+    def __xor__(self, other):
+        r = self.__binary(other, np.bitwise_xor)
+        return r if r is not None else BitVector.__xor__(self, other)
+
+    def __repr__(self):
+        return "PackedBitVector(0x{:x}, {:d})".format(self.value, self.width)
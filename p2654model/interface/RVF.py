@@ -32,12 +32,58 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+from collections import deque
+from itertools import count
+
+
 class RVF:
-    umid_current = 0
+    __slots__ = ("umid", "command", "uid", "payload")
+
+    # next() on a count is atomic, so the umids stay unique when messages are built on several threads
+    umids = count()
+    # Free list of recycled messages, None when pooling is disabled
+    pool = None
+    pool_size = 0
 
     def __init__(self):
-        self.umid = RVF.umid_current
-        self.command = ""
+        self.umid = next(RVF.umids)
+        self.command = None  # Command
         self.uid = None
         self.payload = None
-        RVF.umid_current += 1
+
+    @staticmethod
+    def enable_pool(size=1024):
+        '''
+        Keep up to size released messages for reuse by acquire().  A size of 0 disables pooling.
+        '''
+        RVF.pool_size = size
+        RVF.pool = deque() if size > 0 else None
+
+    @staticmethod
+    def acquire():
+        '''
+        Return a message from the pool, or a new one if the pool is disabled or empty.
+        '''
+        pool = RVF.pool
+        if pool is not None:
+            try:
+                rvf = pool.pop()
+            except IndexError:
+                return RVF()
+            rvf.umid = next(RVF.umids)
+            return rvf
+        return RVF()
+
+    @staticmethod
+    def release(rvf):
+        '''
+        Give back a message that is no longer referenced so acquire() can reuse it.
+        '''
+        pool = RVF.pool
+        # A released message has no umid until it is acquired again, so a second release is ignored
+        if pool is not None and rvf.umid is not None and len(pool) < RVF.pool_size:
+            rvf.umid = None
+            rvf.command = None
+            rvf.uid = None
+            rvf.payload = None
+            pool.append(rvf)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+    Retargeting engine computing the keyreg updates needed to reach a set of registers.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Retargeting engine computing the keyreg updates needed to reach a set of registers.
+    The topology is treated as a graph where each ScanMux or DataMux on the path to a target
+    register selects one of its children through the value of its keyreg.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from threading import Lock
+
+import logging
+from autologging import traced, logged
+
+from p2654model.error.SchedulerError import SchedulerError
+
+
+# create logger
+module_logger = logging.getLogger('P2654Model.scheduler.Retargeter')
+
+
+@logged
+@traced
+class Retargeter:
+    def __init__(self, topology):
+        self.logger = logging.getLogger('P2654Model.scheduler.Retargeter.Retargeter')
+        self.logger.info('Creating an instance of Retargeter')
+        self.topology = topology
+        self.__plans = {}  # frozenset of target uids -> plan
+        self.__plans_mutex = Lock()
+
+    def plan(self, targets):
+        '''
+        Return the plan making every target assembly part of an active scan path.
+        A plan is a list of stages, each stage a list of (mux, child) selections.
+        The keyregs of a stage are only reachable once the previous stages have been applied.
+        Plans are cached per set of targets.
+        '''
+        key = frozenset(t.uid for t in targets)
+        self.__plans_mutex.acquire()
+        plan = self.__plans.get(key)
+        self.__plans_mutex.release()
+        if plan is None:
+            plan = self.__build_plan(targets)
+            self.__plans_mutex.acquire()
+            self.__plans[key] = plan
+            self.__plans_mutex.release()
+        return plan
+
+    def clear(self):
+        '''
+        Forget the cached plans.  Must be called when the topology is modified.
+        '''
+        self.__plans_mutex.acquire()
+        self.__plans = {}
+        self.__plans_mutex.release()
+
+    def __build_plan(self, targets):
+        selections = {}  # mux uid -> (mux, child)
+        stages = {}  # mux uid -> stage index
+        for t in targets:
+            self.__require(t, selections, stages, set())
+        plan = [[] for i in range(max(stages.values()) + 1)] if stages else []
+        for uid, selection in selections.items():
+            plan[stages[uid]].append(selection)
+        return plan
+
+    def __require(self, target, selections, stages, visiting):
+        '''
+        Record the selections needed on the path of target.
+        Returns the stage after which target is reachable (-1 if it is always reachable).
+        '''
+        from p2654model.assembly.DataMux import DataMux
+        from p2654model.assembly.ScanMux import ScanMux
+        stage = -1
+        child = target
+        for a in self.topology.getAncestors(target.uid):
+            if isinstance(a, ScanMux) or isinstance(a, DataMux):
+                if a.uid in selections:
+                    if selections[a.uid][1] is not child:
+                        raise SchedulerError("Retargeter: targets require conflicting selections of {:s}.".format(a.name))
+                else:
+                    if a.keyreg is None:
+                        raise SchedulerError("keyreg must be defined before use.")
+                    if a.uid in visiting:
+                        raise SchedulerError("Retargeter: keyreg of {:s} depends on its own selection.".format(a.name))
+                    if a.description.get_first_match(child.uid) is None:
+                        raise SchedulerError("Unable to locate selector for uid {:d}.".format(child.uid))
+                    # The keyreg must itself be reachable before it can be written
+                    visiting.add(a.uid)
+                    stages[a.uid] = self.__require(a.keyreg, selections, stages, visiting) + 1
+                    visiting.discard(a.uid)
+                    selections[a.uid] = (a, child)
+                stage = max(stage, stages[a.uid])
+            child = a
+        return stage
+
+    @staticmethod
+    def is_selected(mux, child):
+        '''
+        True when the current keyreg value of mux already selects child.
+        '''
+        from p2654model.assembly.ScanMux import ScanMux
+        try:
+            if isinstance(mux, ScanMux):
+                seg = mux.description.get_ir_dr(mux.keyreg.get_value())
+            else:
+                seg = mux.description.get_addr_dr(mux.keyreg.get_value())
+        except SchedulerError:
+            return False
+        return seg is child
@@ -32,7 +32,11 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+import asyncio
 import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock, Condition, Event, Thread
 from time import sleep
 
@@ -41,7 +45,7 @@ from autologging import traced, logged
 from myhdl import intbv
 
 from p2654model.error.SchedulerError import SchedulerError
-from p2654model.interface.AccessInterface import AccessInterface
+from p2654model.scheduler.Retargeter import Retargeter
 from p2654model.topology.Topology import Topology
 
 
@@ -55,15 +59,19 @@ class SchedulerFactory:
     inst = None
 
     @staticmethod
-    def get_scheduler(max_aging=0, watchdog_us=0):
+    def get_scheduler(max_aging=0, watchdog_us=0, max_workers=None, max_aging_us=0, auto_flush=False,
+                      flush_threshold=0):
         if SchedulerFactory.inst is None:
-            SchedulerFactory.inst = Scheduler(max_aging=max_aging, watchdog_us=watchdog_us)
+            SchedulerFactory.inst = Scheduler(max_aging=max_aging, watchdog_us=watchdog_us, max_workers=max_workers,
+                                              max_aging_us=max_aging_us, auto_flush=auto_flush,
+                                              flush_threshold=flush_threshold)
         return SchedulerFactory.inst
 
 
 @traced
 class Scheduler:
-    def __init__(self, max_aging=0, watchdog_us=0):
+    def __init__(self, max_aging=0, watchdog_us=0, max_workers=None, max_aging_us=0, auto_flush=False,
+                 flush_threshold=0):
         '''
         the max aging value for the leaf segments. Passed that, the
         segment is closed by a possible crossroads set to "automatic"
@@ -72,15 +80,36 @@ class Scheduler:
         self.logger.info('Creating an instance of Scheduler')
         self.max_aging = max_aging
         '''
+        the max aging of a captured value, expressed in scan cycles (max_aging) and/or
+        microseconds (max_aging_us).  read() returns a capture younger than every non zero
+        bound without scanning; an older capture is refreshed first.
+        if both are 0, read() returns the last captured value as is.
+        '''
+        self.max_aging_us = max_aging_us
+        # Number of cycles that scanned something, used to stamp captured values
+        self.cycle_count = 0
+        '''
         the period of the watchdog timer, expressed in microseconds.
         if 0, the "full pending" option is not active, and the watchdog
         is therefore unset.
         '''
         self.watchdog_us = watchdog_us
-        # Flag to use watchdog timer for operations or not
+        # Flag to use watchdog timer for operations or not.  In auto flush mode the watchdog
+        # is the flush deadline of a batch and apply() always waits for the end of its cycle.
         self.fullpending_option = False
-        if watchdog_us != 0:
+        if watchdog_us != 0 and not auto_flush:
             self.fullpending_option = True
+        '''
+        auto flush mode: writes accumulate without apply() calls and a cycle is started
+        once flush_threshold writes are pending (if not 0) or watchdog_us microseconds
+        after the first write of the batch (if not 0), whichever comes first.
+        apply() still flushes immediately and waits for the end of the cycle.
+        '''
+        self.auto_flush = auto_flush
+        self.flush_threshold = flush_threshold
+        # Number of writes and monotonic deadline of the batch waiting to be flushed
+        self.batch_size = 0
+        self.batch_deadline = None
         # mutex to regulate the access to the segscan_completed_cv condition variable
         self.release_mutex = Lock()
         # condition variable: notifies the scheduler that the
@@ -109,26 +138,76 @@ class Scheduler:
         self.apply_v = 0
 
         self.apply_start = threading.Event()
-        self.apply_end = threading.Event()
+        # (event loop, future) pairs of the aapply() callers and (None, [event, error]) pairs of
+        # the apply() callers waiting for the next cycle to end
+        self.apply_waiters = []
+        self.apply_waiters_mutex = Lock()
 
         self.t = None
 
 
         # Number of outstanding leaves that are pending
         self.tot_pending_leaves = 0
+        self.pending_mutex = Lock()
+        # uids of the assemblies marked pending since the last cycle started
+        self.dirty = set()
+        self.dirty_mutex = Lock()
+        # uids of the assemblies visited by the current cycle (None visits the whole tree)
+        self.apply_path = None
+        # Worker pool used to apply independent controller subtrees in parallel.
+        # Created on the first cycle that has more than one subtree to apply.
+        self.max_workers = max_workers
+        self.pool = None
         # The topology tree data structure used by this Scheduler
         self.__topology = Topology()
+        self.__topology.max_aging = max_aging
+        # Assemblies registered with the topology reach this Scheduler instead of the SchedulerFactory one
+        self.__topology.scheduler = self
+        # Planner of the keyreg updates needed to reach the registers of a batched access
+        self.retargeter = Retargeter(self.__topology)
+        # (name, operation, instance, value) of the accesses waiting for the scheduler thread to
+        # update the keyregs in front of them, in call order.  An entry stays in the list until
+        # its access is made, so later accesses queue up behind it.
+        self.deferred = deque()
+        self.deferred_mutex = Lock()
         # Assembly.set_max_aging(max_aging)
 
-    def mark_pending(self):
+    def mark_pending(self, uid=None):
         self.logger.debug("mark_pending\n")
+        flush = False
+        self.pending_mutex.acquire()
         self.tot_pending_leaves += 1
+        if self.auto_flush and self.in_cycle == 0:
+            # Marks made while a cycle runs are settled by that cycle and do not count
+            flush = self._add_to_batch()
+        self.pending_mutex.release()
+        if uid is not None:
+            self.mark_dirty(uid)
+        if flush:
+            self.apply_start.set()
+
+    def _add_to_batch(self):
+        # Must be called holding pending_mutex.  Returns True when the batch must be flushed now.
+        self.batch_size += 1
+        if self.batch_deadline is None and self.watchdog_us != 0:
+            self.batch_deadline = time.monotonic() + self.watchdog_us / 1000000.0
+        return self.flush_threshold != 0 and self.batch_size >= self.flush_threshold
+
+    def mark_dirty(self, uid):
+        """
+        Record that the assembly with uid has work for the next cycle, without counting
+        it as a pending leaf.
+        """
+        self.dirty_mutex.acquire()
+        self.dirty.add(uid)
+        self.dirty_mutex.release()
 
     def clear_pending(self):
         self.logger.debug("clear_pending\n")
-        if self.tot_pending_leaves == 0:
-            return
-        self.tot_pending_leaves -= 1
+        self.pending_mutex.acquire()
+        if self.tot_pending_leaves > 0:
+            self.tot_pending_leaves -= 1
+        self.pending_mutex.release()
 
     @property
     def topology(self):
@@ -144,8 +223,16 @@ class Scheduler:
         self.stop_event.set()
         self.cycle_mutex.release()
         self.apply_start.set()
-        AccessInterface.stop()
-        self.t.join()
+        # The cycle in progress needs the interfaces to complete
+        if self.t is not None:
+            self.t.join()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        # Only the interfaces of this topology are closed, other schedulers keep running.
+        # The shared dispatcher stops with the last open interface.
+        for ai in self.__topology.getInterfaces():
+            ai.close()
         return 0
 
     def _scan_cycle_handler(self):
@@ -168,18 +255,36 @@ class Scheduler:
             releases the cycle_mutex lock.
             '''
             self.apply_v = 0
-            self._wait_for_cycle()
+            if self.auto_flush:
+                self._wait_for_flush()
+            else:
+                self._wait_for_cycle()
             # sleep(1)
+            # aapply() callers registered from here on are served by the next cycle
+            waiters = self._take_apply_waiters()
+            # Watchdog wakeups and apply() calls with nothing to scan are not scan cycles
+            if self.tot_pending_leaves > 0 or len(self.deferred) > 0:
+                self.cycle_count += 1
 
             # perform a (or a series of) new scan chain cycle(s).
             # self.logger.debug("[{:d}] _scan_cycle_handler() self.tot_pending_leaves = {:d}\n".format(threading.get_ident(), self.tot_pending_leaves))
-            while self.tot_pending_leaves > 0:
-                self._new_cycle()
+            self.in_cycle = 1
+            try:
+                error = self._run_deferred()
+                while self.tot_pending_leaves > 0:
+                    self._new_cycle()
+            except Exception as e:
+                self._release_apply_waiters(waiters, e)
+                raise
+            finally:
+                self.in_cycle = 0
+                if self.auto_flush:
+                    self._close_batch()
 
             # Broadcast all the waiting threads
             # self.logger.debug("[{:d}] _scan_cycle_handler() calling self.end_apply_cv.notifyAll()\n".format(threading.get_ident()))
             # self.end_apply_cv.notifyAll()
-            self.apply_end.set()
+            self._release_apply_waiters(waiters, error)
 
         # try:
         #     self.logger.debug(
@@ -189,18 +294,81 @@ class Scheduler:
         #     raise SchedulerError(
         #         "Scheduler._wait_for_cycle(): error while locking apply_mutex\n{:s}".format(str(e)))
 
+    def _wait_for_flush(self):
+        '''
+        Auto flush mode: wait for apply(), for the batch to reach flush_threshold writes, or for
+        the watchdog of the batch to expire.  With no batch open, the wait is bounded by the
+        watchdog period so a batch opened meanwhile is noticed in time.
+        '''
+        while not self.stop_event.is_set():
+            deadline = self.batch_deadline
+            if deadline is None:
+                timeout = self.watchdog_us / 1000000.0 if self.watchdog_us != 0 else None
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            if self.apply_start.wait(timeout):
+                break
+        self.apply_start.clear()
+
+    def _close_batch(self):
+        self.pending_mutex.acquire()
+        self.batch_size = 0
+        self.batch_deadline = None
+        if self.tot_pending_leaves > 0:
+            # Writes that arrived after the last scan of the cycle open the next batch
+            self._add_to_batch()
+        self.pending_mutex.release()
+
+    def _take_apply_waiters(self):
+        self.apply_waiters_mutex.acquire()
+        waiters = self.apply_waiters
+        self.apply_waiters = []
+        self.apply_waiters_mutex.release()
+        return waiters
+
+    def _add_apply_waiter(self, loop, waiter):
+        self.apply_waiters_mutex.acquire()
+        self.apply_waiters.append((loop, waiter))
+        self.apply_waiters_mutex.release()
+
+    def _release_apply_waiters(self, waiters, error=None):
+        """
+        Wake up the apply() callers and complete the futures of the aapply() callers from the
+        scheduler thread.
+        """
+        for loop, waiter in waiters:
+            if loop is None:
+                waiter[1] = error
+                waiter[0].set()
+            elif not waiter.done() and not loop.is_closed():
+                # The caller may have given up and closed its loop meanwhile: that must not
+                # stop the scheduler thread
+                try:
+                    loop.call_soon_threadsafe(self._complete_future, waiter, error)
+                except RuntimeError as e:
+                    self.logger.debug("Scheduler: aapply() waiter dropped: %s\n", e)
+
+    @staticmethod
+    def _complete_future(future, error):
+        if future.done():
+            return  # cancelled by the caller
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(SchedulerError("Scheduler.aapply: Error detected during cycle.\n{:s}".format(str(error))))
+
     def _wait_for_cycle(self):
         if self.fullpending_option:
-            self.logger.debug(
-                "[{:d}] _wait_for_cycle(): self.start_apply_cv.wait(self.watchdog_us / 1000000.0)\n".format(
-                    threading.get_ident()))
+            self.logger.debug("[%d] _wait_for_cycle(): self.start_apply_cv.wait(self.watchdog_us / 1000000.0)\n",
+                              threading.get_ident())
             # self.start_apply_cv.wait(self.watchdog_us / 1000000.0)
             self.apply_start.wait(self.watchdog_us / 1000000.0)
             self.apply_start.clear()
         else:
-            self.logger.debug(
-                "[{:d}] _wait_for_cycle(): self.start_apply_cv.wait(self.watchdog_us / 1000000.0)\n".format(
-                    threading.get_ident()))
+            self.logger.debug("[%d] _wait_for_cycle(): self.start_apply_cv.wait(self.watchdog_us / 1000000.0)\n",
+                              threading.get_ident())
             # self.start_apply_cv.wait()
             self.apply_start.wait()
             self.apply_start.clear()
@@ -231,7 +399,58 @@ class Scheduler:
 
     def _new_cycle(self):
         # self.logger.debug("[{:d}] Entering _new_cycle()\n".format(threading.get_ident()))
-        self.topology.top.apply()
+        self.dirty_mutex.acquire()
+        dirty = self.dirty
+        self.dirty = set()
+        self.dirty_mutex.release()
+        self.apply_path = self._pending_paths(dirty)
+        groups = self._independent_roots()
+        if len(groups) == 1:
+            self._apply_roots(groups[0])
+        elif len(groups) > 1:
+            # Controllers do not share a scan chain, so their subtrees are applied concurrently
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="P2654Apply")
+            futures = [self.pool.submit(self._apply_roots, g) for g in groups]
+            for f in futures:
+                f.result()
+
+    def _independent_roots(self):
+        """
+        Group the top level assemblies with work in this cycle by the JTAG controller they drive.
+        Roots sharing a controller are kept in the same group and applied in order.
+        """
+        groups = {}
+        for root in self.topology.getRoots():
+            if self.apply_path is not None and root.uid not in self.apply_path:
+                continue
+            key = id(getattr(root, "jtag_controller", root))
+            groups.setdefault(key, []).append(root)
+        return list(groups.values())
+
+    @staticmethod
+    def _apply_roots(roots):
+        for root in roots:
+            root.apply()
+
+    def _pending_paths(self, dirty):
+        """
+        Collect the uids of the dirty assemblies and all of their ancestors.
+        Falls back to a full traversal (None) when an assembly is not in the topology registry.
+        """
+        apply_path = set()
+        try:
+            for uid in dirty:
+                if uid in apply_path:
+                    continue
+                apply_path.add(uid)
+                for a in self.topology.getAncestors(uid):
+                    if a.uid in apply_path:
+                        break
+                    apply_path.add(a.uid)
+        except SchedulerError:
+            return None
+        return apply_path
 
     def lock_request(self, uid):
         from p2654model.assembly.LeafAssembly import LeafAssembly
@@ -239,7 +458,7 @@ class Scheduler:
         if seg is not None:
             leaf = seg
             try:
-                self.logger.debug("[{:d}] lock_request() calling self.cycle_mutex.acquire()\n".format(threading.get_ident()))
+                self.logger.debug("[%d] lock_request() calling self.cycle_mutex.acquire()\n", threading.get_ident())
                 self.cycle_mutex.acquire()
             except RuntimeError as e:
                 raise SchedulerError(
@@ -247,14 +466,15 @@ class Scheduler:
             if self.tot_pending_leaves >= 0:
                 in_cycle = 1
                 try:
-                    self.logger.debug("[{:d}] lock_request() calling self.start_cycle_cv.notify()\n".format(threading.get_ident()))
+                    self.logger.debug("[%d] lock_request() calling self.start_cycle_cv.notify()\n",
+                                      threading.get_ident())
                     self.start_cycle_cv.notify()
                 except RuntimeError:
                     raise SchedulerError(
                         "Scheduler.lock_request(): error while signalling start_cycle_cv on leaf {:d}.".format(
                             uid))
             try:
-                self.logger.debug("[{:d}] lock_request() calling self.cycle_mutex.release()\n".format(threading.get_ident()))
+                self.logger.debug("[%d] lock_request() calling self.cycle_mutex.release()\n", threading.get_ident())
                 self.cycle_mutex.release()
             except RuntimeError:
                 raise SchedulerError("error while unlocking cycle_mutex on leaf {:d}.".format(uid))
@@ -271,14 +491,15 @@ class Scheduler:
         #         raise SchedulerError(
         #             "Scheduler.lock_release(): error while releasing cycle_mutex on leaf {:d}.\n{:s}".format(uid, str(e)))
         try:
-            self.logger.debug("[{:d}] lock_release() calling self.release_mutex.acquire()\n".format(threading.get_ident()))
+            self.logger.debug("[%d] lock_release() calling self.release_mutex.acquire()\n", threading.get_ident())
             self.release_mutex.acquire()
             self.release_v = 1
             try:
-                self.logger.debug("[{:d}] lock_release() calling self.release_cv.notify()\n".format(threading.get_ident()))
+                self.logger.debug("[%d] lock_release() calling self.release_cv.notify()\n", threading.get_ident())
                 self.release_cv.notify()
                 try:
-                    self.logger.debug("[{:d}] lock_release() calling self.release_mutex.release()\n".format(threading.get_ident()))
+                    self.logger.debug("[%d] lock_release() calling self.release_mutex.release()\n",
+                                      threading.get_ident())
                     self.release_mutex.release()
                     return 0
                 except RuntimeError as e:
@@ -303,7 +524,9 @@ class Scheduler:
         return None
 
     def _lookup(self, uid, type_):
-        result = self._lookup_r(self.topology.top, uid, type_)
+        result = self.topology.getAssembly(uid)
+        if result is not None and not isinstance(result, type_):
+            result = None
         if result is None:
             raise SchedulerError("uid[{:d}] does not exist.".format(uid))
         return result
@@ -316,7 +539,7 @@ class Scheduler:
             try:
                 inst = self.topology.getAssembly(uid)
                 try:
-                    inst.write(value)
+                    self._access("write", "write", inst, value)
                     # try:
                     #     self.lock_release(uid)
                     # except SchedulerError as e:
@@ -341,7 +564,7 @@ class Scheduler:
             try:
                 inst = self.topology.getAssembly(uid)
                 try:
-                    inst.write_read(value)
+                    self._access("write_read", "write_read", inst, value)
                     # try:
                     #     self.lock_release(uid)
                     # except SchedulerError as e:
@@ -367,15 +590,19 @@ class Scheduler:
         #     raise SchedulerError(
         #         "Scheduler.apply(): error while locking apply_mutex\n{:s}".format(str(e)))
         # self.start_apply_cv.notifyAll()
+        # Every caller waits for the end of a cycle started after its call, whether or not
+        # other cycles were started by aapply() or by the auto flush meanwhile
+        waiter = [threading.Event(), None]
+        self._add_apply_waiter(None, waiter)
         self.apply_start.set()
         if self.fullpending_option:
             # self.end_apply_cv.wait(self.watchdog_us / 1000000.0)
-            self.apply_end.wait(self.watchdog_us / 1000000.0)
-            self.apply_end.clear()
+            waiter[0].wait(self.watchdog_us / 1000000.0)
         else:
             # self.end_apply_cv.wait()
-            self.apply_end.wait()
-            self.apply_end.clear()
+            waiter[0].wait()
+        if waiter[1] is not None:
+            raise SchedulerError("Scheduler.apply: Error detected during cycle.\n{:s}".format(str(waiter[1])))
         self.apply_v = 1
         # try:
         #     self.logger.debug(
@@ -418,7 +645,12 @@ class Scheduler:
         # # except SchedulerError as e:
         #     # raise SchedulerError("Scheduler.apply: Error detected while obtaining mutex lock.\n{:s}".format(str(e)))
 
-    def read(self, path):
+    def read(self, path, stamp=False):
+        '''
+        Return the value last captured by the register at path.  With stamp, return a
+        (value, timestamp, cycle) tuple where timestamp is the time.monotonic() and cycle
+        the scan cycle of the capture.
+        '''
         try:
             uid = self.topology.getAssemblyUID(path)
             # try:
@@ -426,7 +658,12 @@ class Scheduler:
             try:
                 inst = self.topology.getAssembly(uid)
                 try:
+                    if self.aging_enabled and not inst.is_pending() and not self._cached(inst):
+                        self._access("read", "refresh", inst)
+                        self.apply()
                     value = inst.read()
+                    if stamp:
+                        return (value,) + inst.read_stamp()
                     return value
                     # try:
                     #     self.lock_release(uid)
@@ -444,3 +681,332 @@ class Scheduler:
             #     raise SchedulerError("Scheduler.read: Error detected while obtaining mutex lock.\n{:s}".format(str(e)))
         except SchedulerError as e:
             raise SchedulerError("Scheduler.read: Error detected while obtaining UID.\n{:s}".format(str(e)))
+
+    async def awrite(self, path, value: intbv):
+        """
+        asyncio variant of write().  Marks the register pending; call aapply() to scan it.
+        The caller only waits, in aapply(), when keyregs have to be updated to reach the register.
+        """
+        inst = self._lookup_path("awrite", path)
+        await self._aretarget("awrite", [inst])
+        try:
+            inst.write(value)
+        except SchedulerError as e:
+            raise SchedulerError("Scheduler.awrite: Error detected while writing to instance.\n{:s}".format(str(e)))
+
+    async def awrite_read(self, path, value: intbv):
+        """
+        asyncio variant of write_read().  Marks the register pending; call aapply() to scan it.
+        The caller only waits, in aapply(), when keyregs have to be updated to reach the register.
+        """
+        inst = self._lookup_path("awrite_read", path)
+        await self._aretarget("awrite_read", [inst])
+        try:
+            inst.write_read(value)
+        except SchedulerError as e:
+            raise SchedulerError(
+                "Scheduler.awrite_read: Error detected while writing to instance.\n{:s}".format(str(e)))
+
+    async def aread(self, path):
+        """
+        asyncio variant of read().  Returns the value captured by the last cycle that scanned the
+        register.  When a capture older than the max aging bounds has to be refreshed, the caller
+        awaits aapply() instead of blocking in apply().
+        """
+        inst = self._lookup_path("aread", path)
+        if self.aging_enabled and not inst.is_pending() and not self._cached(inst):
+            await self._aretarget("aread", [inst])
+            inst.refresh()
+            await self.aapply()
+        try:
+            return inst.read()
+        except SchedulerError as e:
+            raise SchedulerError("Scheduler.aread: Error detected while reading from instance.\n{:s}".format(str(e)))
+
+    async def aapply(self):
+        """
+        asyncio variant of apply().  The caller is suspended on a future completed by the
+        scheduler thread at the end of the next cycle, so no OS thread is blocked while waiting.
+        Any number of coroutines may await aapply() at once; they are all released by the same cycle.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._add_apply_waiter(loop, future)
+        self.apply_start.set()
+        if self.fullpending_option:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.watchdog_us / 1000000.0)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await future
+        self.apply_v = 1
+
+    def write_many(self, accesses):
+        '''
+        Write a list of (path, value) pairs using as few apply cycles as the topology allows.
+        '''
+        self._access_many("write_many", [(path, value, False) for path, value in accesses])
+
+    def write_read_many(self, accesses):
+        '''
+        Write a list of (path, value) pairs and capture the registers using as few apply
+        cycles as the topology allows.  Returns a dict of path -> captured value.
+        '''
+        return self._access_many("write_read_many", [(path, value, True) for path, value in accesses])
+
+    def read_many(self, paths, stamp=False):
+        '''
+        Capture a list of registers using as few apply cycles as the topology allows.
+        Each register is rescanned with the value it already holds, unless its last
+        capture is still within the max aging bounds.
+        Returns a dict of path -> captured value, or of path -> (value, timestamp, cycle)
+        with stamp, as read() does.
+        '''
+        captured = self._access_many("read_many", [(path, None, True) for path in paths])
+        if stamp:
+            for path, value in captured.items():
+                captured[path] = (value,) + self._lookup_path("read_many", path).read_stamp()
+        return captured
+
+    def retarget(self, paths):
+        '''
+        Update the keyregs of the ScanMux and DataMux assemblies so every register in paths
+        is on an active scan path.  Keyregs already selecting the right child are left alone,
+        and keyregs that do not depend on each other are updated in the same apply cycle.
+        '''
+        self._retarget("retarget", [self._lookup_path("retarget", path) for path in paths])
+
+    def _lookup_path(self, name, path):
+        try:
+            uid = self.topology.getAssemblyUID(path)
+            return self.topology.getAssembly(uid)
+        except SchedulerError as e:
+            raise SchedulerError(
+                "Scheduler.{:s}: Error detected while obtaining instance.\n{:s}".format(name, str(e)))
+
+    def _access(self, name, operation, inst, *args):
+        '''
+        Call operation of inst right away when inst is on an active scan path.  Otherwise the
+        access is left to the scheduler thread, which updates the keyregs in front of inst in
+        as many cycles as needed before making it, so the caller never waits for a cycle.
+        Errors of a deferred access are reported by the apply() that runs it.
+        '''
+        self.deferred_mutex.acquire()
+        try:
+            defer = len(self.deferred) > 0 or self._needs_retarget(name, inst)
+            if defer:
+                self.deferred.append((name, operation, inst, args))
+        finally:
+            self.deferred_mutex.release()
+        if not defer:
+            getattr(inst, operation)(*args)
+        elif self.auto_flush:
+            self.pending_mutex.acquire()
+            flush = self._add_to_batch()
+            self.pending_mutex.release()
+            if flush:
+                self.apply_start.set()
+
+    def _needs_retarget(self, name, inst):
+        for updates, flush in self._retarget_stages(name, [inst]):
+            if len(updates) > 0 or flush:
+                return True
+        return False
+
+    def _run_deferred(self):
+        '''
+        Scheduler thread: make the deferred accesses in call order, each one once the keyregs
+        in front of it select it.  Returns the error of the first access that failed, if any.
+        '''
+        error = None
+        while True:
+            self.deferred_mutex.acquire()
+            if len(self.deferred) == 0:
+                self.deferred_mutex.release()
+                return error
+            name, operation, inst, args = self.deferred[0]
+            self.deferred_mutex.release()
+            try:
+                for updates, flush in self._retarget_stages(name, [inst]):
+                    if len(updates) == 0 and not flush:
+                        continue
+                    for path, keyreg, code, capture in updates:
+                        keyreg.write(code)
+                    while self.tot_pending_leaves > 0:
+                        self._new_cycle()
+                getattr(inst, operation)(*args)
+            except SchedulerError as e:
+                self.logger.error("Scheduler.%s: deferred access failed: %s\n", name, e)
+                if error is None:
+                    error = SchedulerError(
+                        "Scheduler.{:s}: Error detected while writing to instance.\n{:s}".format(name, str(e)))
+            self.deferred_mutex.acquire()
+            self.deferred.popleft()
+            self.deferred_mutex.release()
+
+    def _retarget(self, name, targets):
+        for updates, flush in self._retarget_stages(name, targets):
+            if len(updates) > 0:
+                self._settle(name, updates, retarget=False)
+            elif flush:
+                self.apply()
+
+    async def _aretarget(self, name, targets):
+        for updates, flush in self._retarget_stages(name, targets):
+            if len(updates) > 0:
+                for r in self._plan_rounds(updates):
+                    for path, inst, value, capture in r:
+                        try:
+                            inst.write(value)
+                        except SchedulerError as e:
+                            raise SchedulerError(
+                                "Scheduler.{:s}: Error detected while writing to instance.\n{:s}".format(name, str(e)))
+                    await self.aapply()
+            elif flush:
+                await self.aapply()
+
+    def _retarget_stages(self, name, targets):
+        '''
+        Yield, stage by stage, the keyreg writes still needed to reach targets and whether a
+        keyreg already holding the right code is waiting to be scanned.  A stage is only
+        examined once the previous one has been applied.
+        '''
+        try:
+            plan = self.retargeter.plan(targets)
+        except SchedulerError as e:
+            raise SchedulerError("Scheduler.{:s}: Error detected while retargeting.\n{:s}".format(name, str(e)))
+        for stage in plan:
+            updates = []
+            flush = False
+            for mux, child in stage:
+                if not self.retargeter.is_selected(mux, child):
+                    path = self.topology.getAssemblyPath(mux.keyreg.uid)
+                    updates.append((path, mux.keyreg, mux.description.get_first_match(child.uid), False))
+                elif mux.keyreg.is_pending():
+                    flush = True
+            yield updates, flush
+
+    def _access_many(self, name, accesses):
+        if len(self.deferred) > 0:
+            # Accesses are made in call order: the deferred ones go first
+            self.apply()
+        pending = []
+        for path, value, capture in accesses:
+            pending.append((path, self._lookup_path(name, path), value, capture))
+        captured = {}
+        if self.aging_enabled:
+            for path, inst, value, capture in pending:
+                if capture and value is None and self._cached(inst):
+                    captured[path] = inst.read()
+            pending = [a for a in pending if a[0] not in captured]
+        captured.update(self._settle(name, pending))
+        return captured
+
+    @property
+    def aging_enabled(self):
+        return self.max_aging != 0 or self.max_aging_us != 0
+
+    def _cached(self, inst):
+        '''
+        True when the last capture of inst is within the max aging bounds and may be
+        returned without scanning.
+        '''
+        if inst.is_pending():
+            return False
+        timestamp, cycle = inst.read_stamp()
+        if cycle is None:
+            return False
+        if self.max_aging != 0 and self.cycle_count - cycle >= self.max_aging:
+            return False
+        if self.max_aging_us != 0 and (time.monotonic() - timestamp) * 1000000.0 >= self.max_aging_us:
+            return False
+        try:
+            inst.read()
+        except SchedulerError:
+            return False
+        return True
+
+    def _settle(self, name, pending, retarget=True):
+        captured = {}
+        for r in self._plan_rounds(pending):
+            if retarget:
+                self._retarget(name, [inst for path, inst, value, capture in r])
+            for path, inst, value, capture in r:
+                try:
+                    if not capture:
+                        inst.write(value)
+                    elif value is None:
+                        inst.refresh()
+                    else:
+                        inst.write_read(value)
+                except SchedulerError as e:
+                    raise SchedulerError(
+                        "Scheduler.{:s}: Error detected while writing to instance.\n{:s}".format(name, str(e)))
+            self.apply()
+            for path, inst, value, capture in r:
+                if capture:
+                    try:
+                        captured[path] = inst.read()
+                    except SchedulerError as e:
+                        raise SchedulerError(
+                            "Scheduler.{:s}: Error detected while reading from instance.\n{:s}".format(name, str(e)))
+        return captured
+
+    def _plan_rounds(self, accesses):
+        '''
+        Partition the accesses into rounds that can each be settled by a single apply cycle.
+        Two accesses conflict when they meet at an assembly that forwards only one request per
+        cycle (e.g. a TAP or a ScanMux), or at a JTAGNetwork in different scan modes.
+        Accesses that conflict are kept in their original order.
+        '''
+        rounds = []  # list of (accesses, exclusive, modes)
+        for access in accesses:
+            exclusive, modes = self._access_keys(access[1])
+            index = 0
+            for i in range(len(rounds) - 1, -1, -1):
+                if self._keys_conflict(exclusive, modes, rounds[i][1], rounds[i][2]):
+                    index = i + 1
+                    break
+            if index == len(rounds):
+                rounds.append(([], {}, {}))
+            rounds[index][0].append(access)
+            rounds[index][1].update(exclusive)
+            rounds[index][2].update(modes)
+        return [r[0] for r in rounds]
+
+    def _access_keys(self, inst):
+        '''
+        exclusive: uid of each assembly on the path -> uid of the child the path passes through
+        (None for the accessed register itself).
+        modes: uid of each JTAGNetwork on the path -> True for a DR scan, False for an IR scan.
+        JTAGNetwork and IJTAGNetwork merge the requests of their children into one scan,
+        so they are not exclusive.
+        '''
+        from p2654model.assembly.IJTAGNetwork import IJTAGNetwork
+        from p2654model.assembly.JTAGNetwork import JTAGNetwork
+        from p2654model.assembly.TAP import TAP
+        exclusive = {inst.uid: None}
+        modes = {}
+        data_mode = None
+        child = inst
+        for a in self.topology.getAncestors(inst.uid):
+            if isinstance(a, JTAGNetwork):
+                modes[a.uid] = data_mode
+            elif not isinstance(a, IJTAGNetwork):
+                exclusive[a.uid] = child.uid
+                if isinstance(a, TAP):
+                    data_mode = child is not a.depth()
+            child = a
+        return exclusive, modes
+
+    @staticmethod
+    def _keys_conflict(exclusive, modes, round_exclusive, round_modes):
+        for uid, child in exclusive.items():
+            if uid in round_exclusive:
+                if child is None or round_exclusive[uid] is None or round_exclusive[uid] != child:
+                    return True
+        for uid, mode in modes.items():
+            if uid in round_modes and round_modes[uid] != mode:
+                return True
+        return False
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+    Supervisor running the same access script on several boards in worker processes.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Supervisor running the same access script on several boards in worker processes.
+    Every site (board) is served by its own process holding a Scheduler and an ATE session,
+    so the sites do not contend for the GIL.  The values read by the script are written by
+    the workers into a shared memory block instead of being pickled back one by one.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import logging
+from autologging import traced, logged
+from myhdl import intbv
+
+from p2654model.error.SchedulerError import SchedulerError
+
+
+# create logger
+module_logger = logging.getLogger('P2654Model.scheduler.SiteSupervisor')
+
+
+def ate_controller_factory(site):
+    '''
+    Default controller factory: site is an (ip, port, board) tuple naming the simulation
+    server and the board to start on it.  Returns the JTAGController of the board and the
+    ATE session to close once the script has run.
+    '''
+    from drivers.ate.atesim import ATE, JTAGController
+    ip, port, board = site
+    ate_inst = ATE(ip=ip, port=port)
+    ate_inst.connect(board)
+    return JTAGController(ate_inst), ate_inst
+
+
+def _layout(script):
+    '''
+    Return the (offset, byte count, width) slot of every read of script in the result
+    record of a site, and the size of that record.
+    '''
+    slots = []
+    size = 0
+    for op in script:
+        if op[0] == "read":
+            if len(op) != 3 or op[2] <= 0:
+                raise SchedulerError("SiteSupervisor: read of {:s} needs a bit width.".format(str(op[1])))
+            nbytes = (op[2] + 7) // 8
+            slots.append((size, nbytes, op[2]))
+            size += nbytes
+    return slots, size
+
+
+def _run_site(site, configure, controller_factory, scheduler_args, script, shm_name, base):
+    '''
+    Worker process procedure: run script on site and store the values read at base in
+    the shared memory block shm_name.
+    '''
+    from p2654model.scheduler.Scheduler import Scheduler
+    controller, session = controller_factory(site)
+    try:
+        scheduler = Scheduler(**scheduler_args)
+        configure(scheduler, controller)
+        shm = shared_memory.SharedMemory(name=shm_name)
+        scheduler.start()
+        try:
+            offset = base
+            for op in script:
+                if op[0] == "write":
+                    scheduler.write(op[1], op[2])
+                elif op[0] == "write_read":
+                    scheduler.write_read(op[1], op[2])
+                elif op[0] == "apply":
+                    scheduler.apply()
+                elif op[0] == "read":
+                    nbytes = (op[2] + 7) // 8
+                    value = int(scheduler.read(op[1])) & ((1 << op[2]) - 1)
+                    shm.buf[offset:offset + nbytes] = value.to_bytes(nbytes, "big")
+                    offset += nbytes
+                else:
+                    raise SchedulerError("SiteSupervisor: unknown script operation {:s}.".format(str(op[0])))
+        finally:
+            shm.close()
+            scheduler.stop()
+    finally:
+        if session is not None:
+            session.close()
+
+
+@logged
+@traced
+class SiteSupervisor:
+    '''
+    Run one Scheduler per site in a pool of worker processes.
+
+    configure(scheduler, controller) builds the model of a board in the topology of the
+    scheduler, as done for a single board.  controller_factory(site) opens the session to
+    the board of a site and returns (controller, session); session.close() is called when
+    the site is done.  configure, controller_factory and the sites are sent to the workers
+    so they must be picklable (module level functions and plain data).
+    '''
+    def __init__(self, sites, configure, controller_factory=ate_controller_factory, processes=None,
+                 scheduler_args=None):
+        self.logger = logging.getLogger('P2654Model.scheduler.SiteSupervisor.SiteSupervisor')
+        self.logger.info('Creating an instance of SiteSupervisor')
+        self.sites = list(sites)
+        self.configure = configure
+        self.controller_factory = controller_factory
+        self.processes = processes if processes is not None else len(self.sites)
+        self.scheduler_args = scheduler_args if scheduler_args is not None else {}
+        # index of site -> error message of the last run
+        self.errors = {}
+
+    def run(self, script):
+        '''
+        Run script on every site at once.  script is a list of operations:
+            ("write", path, value), ("write_read", path, value), ("apply",), ("read", path, width)
+        Returns, for every site, the list of the values read by the script as intbv of the
+        given widths, or None if the site failed (see errors).
+        '''
+        slots, record = _layout(script)
+        self.errors = {}
+        # SharedMemory does not accept a size of 0
+        shm = shared_memory.SharedMemory(create=True, size=max(1, record * len(self.sites)))
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.processes, mp_context=ctx) as pool:
+                futures = [pool.submit(_run_site, site, self.configure, self.controller_factory,
+                                       self.scheduler_args, script, shm.name, i * record)
+                           for i, site in enumerate(self.sites)]
+                for i, f in enumerate(futures):
+                    try:
+                        f.result()
+                    except Exception as e:
+                        self.logger.error("SiteSupervisor: site %s failed: %s\n", self.sites[i], e)
+                        self.errors[i] = str(e)
+            results = []
+            for i in range(len(self.sites)):
+                if i in self.errors:
+                    results.append(None)
+                    continue
+                base = i * record
+                values = []
+                for offset, nbytes, width in slots:
+                    v = int.from_bytes(shm.buf[base + offset:base + offset + nbytes], "big")
+                    values.append(intbv(v)[width:])
+                results.append(values)
+            return results
+        finally:
+            shm.close()
+            shm.unlink()
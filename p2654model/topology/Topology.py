@@ -62,6 +62,11 @@ class Topology(object):
         self.__totpending_mutex = Lock()  # Mutex for processing pending Leaf nodes
         self.__top = None  # root node
         self.__uid_counter = 0  # running assignment for uid's added to the model
+        self.__uid_map = {}  # registry of uid -> assembly
+        self.__path_map = {}  # registry of absolute path -> uid
+        self.__uid_path_map = {}  # registry of uid -> absolute path
+        self.__parent_map = {}  # registry of uid -> parent assembly
+        self.scheduler = None  # Scheduler owning this topology, bound to every registered assembly
 
     @property
     def top(self):
@@ -70,6 +75,94 @@ class Topology(object):
     @top.setter
     def top(self, t):
         self.__top = t
+        self.build_registry()
+
+    def register(self, assembly):
+        '''
+        Add an assembly to the uid registry.  Assemblies created by the define*() methods
+        are registered automatically.
+        '''
+        if assembly.uid is None:
+            raise SchedulerError("Topology.register(): uid was None.")
+        self.__uid_map[assembly.uid] = assembly
+        if self.scheduler is not None:
+            assembly.scheduler = self.scheduler
+
+    def build_registry(self):
+        '''
+        Rebuild the uid and absolute path registries from the current tree.
+        Must be called again if the tree is modified after top has been assigned.
+        '''
+        self.__path_map = {}
+        self.__uid_path_map = {}
+        self.__parent_map = {}
+        self._build_registry_r(self.top, "", None)
+
+    def _build_registry_r(self, node, prefix, parent):
+        '''
+        Recursive procedure used to index the path of every segment below node.
+        Hidden assemblies (visible=False) do not contribute a token to the path of their children.
+        '''
+        s = node
+        while s is not None:
+            if s.is_visible():
+                path = s.name if prefix == "" else prefix + "." + s.name
+                if path not in self.__path_map:
+                    self.__path_map[path] = s.uid
+            else:
+                path = prefix
+            if self.scheduler is not None:
+                s.scheduler = self.scheduler
+            if s.uid is not None:
+                self.__uid_map[s.uid] = s
+                self.__uid_path_map[s.uid] = path
+                self.__parent_map[s.uid] = parent
+            self._build_registry_r(s.depth(), path, s)
+            s = s.breadth()
+
+    def addRoot(self, root):
+        '''
+        Add a top level assembly next to top, e.g. the JTAGControllerAssembly of another
+        controller of the board.  The Scheduler applies the roots driving different
+        controllers in parallel and the roots sharing a controller in order.
+        '''
+        if root is None:
+            raise SchedulerError("Topology.addRoot(): root was None.")
+        if self.top is None:
+            self.top = root
+            return
+        s = self.top
+        while True:
+            if s is root or s.name == root.name:
+                raise SchedulerError("Topology.addRoot(): Duplicate root name {:s}.".format(root.name))
+            if s.breadth() is None:
+                break
+            s = s.breadth()
+        s._breadth_next = root
+        self.build_registry()
+
+    def getRoots(self):
+        """
+        Return the top level assemblies: top and its breadth siblings (e.g. one
+        JTAGControllerAssembly per controller on the board).
+        """
+        roots = []
+        s = self.top
+        while s is not None:
+            roots.append(s)
+            s = s.breadth()
+        return roots
+
+    def getInterfaces(self):
+        '''
+        Return the access interfaces connecting the assemblies of the tree, each once.
+        '''
+        interfaces = []
+        for assembly in self.__uid_map.values():
+            for ai in (assembly.client_interface, assembly.host_interface):
+                if ai is not None and all(ai is not i for i in interfaces):
+                    interfaces.append(ai)
+        return interfaces
 
     def getLeafCount(self):
         return self.__totleaves
@@ -82,6 +175,7 @@ class Topology(object):
         reg.uid = self.__uid_counter
         self.__uid_counter += 1
         self.__totleaves += 1
+        self.register(reg)
         return reg
 
     def defineScanMux(self, name, entity_name, keyreg, rmap):
@@ -98,6 +192,7 @@ class Topology(object):
         mux.uid = self.__uid_counter
         self.__uid_counter += 1
         self.__totleaves += 1
+        self.register(mux)
         return mux
 
     def defineTAP(self, name, entity_name, tir, mux):
@@ -110,6 +205,7 @@ class Topology(object):
         tap.append_assembly(mux)
         tap.uid = self.__uid_counter
         self.__uid_counter += 1
+        self.register(tap)
         return tap
 
     def defineJTAGControllerAssembly(self, name, entity_name, jtag_controller, tap):
@@ -121,6 +217,7 @@ class Topology(object):
         jc.append_assembly(tap)
         jc.uid = self.__uid_counter
         self.__uid_counter += 1
+        self.register(jc)
         return jc
 
     def getAssembly_r(self, uid, node):
@@ -138,9 +235,34 @@ class Topology(object):
         return None
 
     def getAssembly(self, uid):
-        return self.getAssembly_r(uid, self.top)
+        a = self.__uid_map.get(uid)
+        if a is None:
+            a = self.getAssembly_r(uid, self.top)
+            if a is not None:
+                self.__uid_map[uid] = a
+        return a
+
+    def getParent(self, uid):
+        if uid not in self.__parent_map:
+            raise SchedulerError("Topology.getParent(): uid does not exist (%d)" % uid)
+        return self.__parent_map[uid]
+
+    def getAncestors(self, uid):
+        '''
+        Return the list of assemblies between the given uid and the root,
+        starting with the parent of the assembly.
+        '''
+        ancestors = []
+        a = self.getParent(uid)
+        while a is not None:
+            ancestors.append(a)
+            a = self.__parent_map[a.uid]
+        return ancestors
 
     def getAssemblyPath(self, uid):
+        abs_path = self.__uid_path_map.get(uid)
+        if abs_path is not None:
+            return abs_path
         period = 0
         tokenized_path = []
         abs_path = ""
@@ -185,9 +307,14 @@ class Topology(object):
         return None
 
     def getAssemblyUID(self, abs_path):
-        index = 0
-        depth_seg = self.top
-        return self.getAssemblyUID_r(abs_path, index, depth_seg)
+        uid = self.__path_map.get(abs_path)
+        if uid is None:
+            index = 0
+            depth_seg = self.top
+            uid = self.getAssemblyUID_r(abs_path, index, depth_seg)
+            if uid is not None:
+                self.__path_map[abs_path] = uid
+        return uid
 
     def _tokenize(self, abs_path, index):
         tokens = abs_path[index:].split('.')
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the AccessInterface message queues.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the shared Dispatcher serving the queues of the AccessInterface class.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import sys
+import threading
+import time
+import unittest
+
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Dispatcher import Channel, Dispatcher, DispatcherFactory
+from p2654model.interface.RVF import RVF
+from p2654model.interface.SCANAccessInterface import SCANAccessInterface
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class DispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher(workers=4)
+        self.log = []
+        self.log_mutex = threading.Lock()
+
+    def tearDown(self):
+        self.dispatcher.stop()
+
+    def recorder(self, name):
+        def handler(item):
+            self.log_mutex.acquire()
+            self.log.append((name, item))
+            self.log_mutex.release()
+        return handler
+
+    def test_thread_count_does_not_grow_with_interfaces(self):
+        DispatcherFactory.get_dispatcher()
+        threads = set(threading.enumerate())
+        interfaces = [SCANAccessInterface() for i in range(100)]
+        self.assertEqual(set(threading.enumerate()) - threads, set())
+        self.assertTrue(all(ai.reqQ.dispatcher is DispatcherFactory.get_dispatcher() for ai in interfaces))
+
+    def test_channel_order(self):
+        channels = [self.dispatcher.channel(self.recorder(name)) for name in "ABCD"]
+        for i in range(200):
+            for c in channels:
+                c.put(i)
+        self.assertTrue(wait_until(lambda: len(self.log) == 800))
+        for name in "ABCD":
+            self.assertEqual([item for n, item in self.log if n == name], list(range(200)))
+
+    def test_burst_fairness(self):
+        dispatcher = Dispatcher(workers=1)
+        gate = threading.Event()
+        record = self.recorder("A")
+
+        def blocking(item):
+            if item == 0:
+                gate.wait(5)
+            record(item)
+
+        a = dispatcher.channel(blocking)
+        b = dispatcher.channel(self.recorder("B"))
+        for i in range(100):
+            a.put(i)
+        # The only worker is held by the first message of A while B queues up behind it
+        b.put(0)
+        gate.set()
+        self.assertTrue(wait_until(lambda: len(self.log) == 101))
+        dispatcher.stop()
+        # A gives the worker back after a burst, B does not wait for the rest of A
+        self.assertEqual(self.log.index(("B", 0)), Channel.burst)
+        self.assertEqual(a.stats()["dispatched"], 100)
+
+
+class BackpressureTestCase(unittest.TestCase):
+    def setUp(self):
+        self.ai = SCANAccessInterface()
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.handled = []
+        self.ai.set_req_callback(1, self.handled.append)
+        self.ai.set_resp_callback(1, self.blocking)
+
+    def tearDown(self):
+        self.gate.set()
+        self.ai.close()
+
+    def blocking(self, rvf: RVF):
+        # The first response holds its worker until the gate opens
+        self.entered.set()
+        self.gate.wait(5)
+        self.handled.append(rvf)
+
+    @staticmethod
+    def message(uid=1):
+        rvf = RVF()
+        rvf.uid = uid
+        return rvf
+
+    def request(self, count):
+        for i in range(count):
+            self.ai.request(self.message())
+        self.assertTrue(wait_until(lambda: len(self.handled) == count))
+        del self.handled[:]
+
+    def test_non_blocking_response_keeps_the_request_outstanding(self):
+        self.request(3)
+        self.ai.set_queue_limit(1, block=False)
+        self.ai.response(self.message())
+        self.assertTrue(self.entered.wait(5))
+        self.ai.response(self.message())
+        with self.assertRaises(SchedulerError):
+            self.ai.response(self.message())
+        # Only the two accepted responses settle a request
+        self.assertEqual(self.ai.outstanding_count(1), 1)
+        self.gate.set()
+        self.assertTrue(wait_until(lambda: len(self.handled) == 2))
+        self.assertEqual(self.ai.queue_stats()["response"]["high_water"], 1)
+
+    def test_non_blocking_request(self):
+        self.ai.set_req_callback(1, self.blocking)
+        self.ai.set_queue_limit(1, block=False)
+        self.ai.request(self.message())
+        self.assertTrue(self.entered.wait(5))
+        self.ai.request(self.message())
+        with self.assertRaises(SchedulerError):
+            self.ai.request(self.message())
+        self.assertEqual(self.ai.outstanding_count(1), 2)
+
+    def test_blocking_response(self):
+        self.request(3)
+        self.ai.set_queue_limit(1, block=True)
+        self.ai.response(self.message())
+        self.assertTrue(self.entered.wait(5))
+        self.ai.response(self.message())
+        producer = threading.Thread(target=self.ai.response, args=(self.message(),), daemon=True)
+        producer.start()
+        producer.join(0.1)
+        # The producer waits for room in the queue, its request is settled before the hand off
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(self.ai.outstanding_count(1), 0)
+        self.gate.set()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertTrue(wait_until(lambda: len(self.handled) == 3))
+        self.assertEqual(self.ai.outstanding_count(1), 0)
+        stats = self.ai.queue_stats()["response"]
+        self.assertEqual(stats["high_water"], 1)
+        self.assertEqual(stats["dispatched"], 3)
+        self.assertEqual(stats["depth"], 0)
+        self.assertGreater(stats["blocked_time"], 0.05)
+        # The second response waited in the queue for the first one to be released
+        self.assertGreater(stats["wait_time"], 0.05)
+
+
+class PooledRoundTripTestCase(unittest.TestCase):
+    def setUp(self):
+        RVF.enable_pool(64)
+        self.interval = sys.getswitchinterval()
+        # Switch threads as often as possible so a worker recycles a response early
+        sys.setswitchinterval(1e-6)
+        self.ai = SCANAccessInterface()
+        self.received = {uid: [] for uid in range(1, 5)}
+        self.ai.set_req_callback(1, self.answer)
+        for uid in self.received:
+            self.ai.set_resp_callback(uid, self.recorder(uid))
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+        self.ai.close()
+        RVF.enable_pool(0)
+
+    def answer(self, rvf: RVF):
+        resp = RVF.acquire()
+        resp.uid = rvf.uid
+        resp.command = rvf.command
+        resp.payload = rvf.payload
+        self.ai.response(resp)
+
+    def recorder(self, uid):
+        def handler(rvf: RVF):
+            self.received[uid].append((rvf.uid, rvf.payload))
+        return handler
+
+    def test_round_trip(self):
+        count = 20000
+        for n in range(3):
+            for responses in self.received.values():
+                del responses[:]
+            for i in range(count):
+                rvf = RVF.acquire()
+                rvf.uid = i % 4 + 1
+                rvf.payload = i
+                self.ai.request(rvf)
+            self.assertTrue(wait_until(lambda: sum(len(r) for r in self.received.values()) == count, 10))
+            self.assertEqual(self.ai.outstanding_count(), 0)
+            for uid, responses in self.received.items():
+                self.assertEqual(responses, [(uid, i) for i in range(uid - 1, count, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the BitVector type.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the BitVector type, checked against the intbv behavior it replaces.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+
+from myhdl import intbv, concat
+
+from p2654model.interface.BitVector import BitVector
+from p2654model.interface import PackedBitVector as packed
+from p2654model.interface.PackedBitVector import PackedBitVector
+
+
+class BitVectorTestCase(unittest.TestCase):
+    def test_matches_intbv(self):
+        b = BitVector(0x2A5A5, 18)
+        i = intbv(0x2A5A5)[18:]
+        self.assertEqual(str(b), str(i))
+        self.assertEqual(len(b[18:10]), 8)
+        self.assertEqual(int(b[18:10]), int(i[18:10]))
+        self.assertEqual(b[0], i[0])
+        self.assertTrue(b == i and i == b)
+        self.assertEqual(bin(b), bin(i))
+
+    def test_concat(self):
+        v = BitVector.concat(BitVector(1, 3), BitVector(2, 4))
+        self.assertEqual(len(v), 7)
+        self.assertEqual(v, concat(intbv(1)[3:], intbv(2)[4:]))
+
+    def test_bytes(self):
+        b = BitVector(0x2A5A5, 18)
+        self.assertEqual(b.to_bytes(), bytes([0x02, 0xA5, 0xA5]))
+        self.assertEqual(BitVector.from_bytes(b.to_bytes(), 18), b)
+
+    def test_of(self):
+        b = BitVector.of(intbv('00000010'))
+        self.assertEqual((b.value, b.width), (2, 8))
+        self.assertIs(BitVector.of(b), b)
+        with self.assertRaises(TypeError):
+            BitVector.of("10")
+
+    def test_bitwise(self):
+        b = BitVector(0x2A5A5, 18)
+        i = intbv(0x2A5A5)[18:]
+        for mask in (0xFF, intbv(0xFF)[18:], BitVector(0xFF, 18)):
+            self.assertEqual(b & mask, i & 0xFF)
+            self.assertEqual(b | mask, i | 0xFF)
+            self.assertEqual(b ^ mask, i ^ 0xFF)
+        # A plain int takes the width of the vector
+        self.assertEqual(len(b & 0xFF), 18)
+        self.assertEqual(len(0xFF & b), 18)
+        self.assertEqual(0xFF | b, b | 0xFF)
+        self.assertEqual(b ^ -1, ~b)
+        with self.assertRaises(TypeError):
+            b & "10"
+
+
+@unittest.skipIf(packed.np is None, "NumPy is not installed")
+class PackedBitVectorTestCase(unittest.TestCase):
+    def test_matches_bitvector(self):
+        p = PackedBitVector.from_int(0x2A5A5, 18)
+        b = BitVector(0x2A5A5, 18)
+        self.assertTrue(p == b and b == p)
+        self.assertEqual(str(p), str(b))
+        self.assertEqual(~p, ~b)
+        self.assertEqual(p[18:10], b[18:10])
+        self.assertEqual(p.to_bytes(), b.to_bytes())
+
+    def test_buffer(self):
+        tdo = bytearray(b'\xa5\xa5\x02')
+        p = PackedBitVector.from_buffer(tdo, 18)
+        self.assertEqual(p.value, 0x2A5A5)
+        self.assertEqual(bytes(p.buffer()), bytes(tdo))
+        # Bits above the width are dropped
+        self.assertEqual(PackedBitVector.from_buffer(bytearray(b'\xa5\xa5\xfe'), 18).value, 0x2A5A5)
+
+    def test_concat(self):
+        vectors = [BitVector(1, 3), PackedBitVector.from_int(0x2A5A5, 18), BitVector(0, 0), BitVector(2, 4)]
+        p = PackedBitVector.concat(*vectors)
+        self.assertIsInstance(p, PackedBitVector)
+        self.assertEqual((p.value, p.width), (BitVector.concat(*vectors).value, 25))
+        self.assertEqual(p.extract(4, 18), 0x2A5A5)
+        self.assertEqual(len(PackedBitVector.concat()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
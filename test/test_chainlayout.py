@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the ChainLayout of a network.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the ChainLayout class joining and splitting the segments of a scan.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+
+from p2654model.assembly.ChainLayout import ChainLayout
+from p2654model.interface.BitVector import BitVector
+from p2654model.interface import PackedBitVector as packed
+from p2654model.interface.PackedBitVector import PackedBitVector
+
+
+class Segment:
+    '''
+    Sibling of a chain, only the uid and the breadth link are used by the layout.
+    '''
+    def __init__(self, uid, sibling=None):
+        self.uid = uid
+        self.sibling = sibling
+
+    def breadth(self):
+        return self.sibling
+
+
+def chain(*uids):
+    first = None
+    for uid in reversed(uids):
+        first = Segment(uid, first)
+    return first
+
+
+def slice_walk(vector, widths):
+    '''
+    Reference split: the first segment is sliced from the most significant bits.
+    '''
+    parts = []
+    hi = sum(widths)
+    for w in widths:
+        lo = hi - w
+        parts.append(vector[hi:lo])
+        hi = lo
+    return parts
+
+
+class ChainLayoutTestCase(unittest.TestCase):
+    def setUp(self):
+        self.layout = ChainLayout(chain(10, 20, 30))
+        self.segments = [BitVector(0x5, 3), BitVector(0x2A5A5, 18), BitVector(0x1, 1)]
+
+    def tearDown(self):
+        ChainLayout.max_layouts = 64
+
+    def test_children(self):
+        self.assertEqual(len(self.layout), 3)
+        self.assertEqual([seg.uid for seg in self.layout.children], [10, 20, 30])
+        self.assertEqual(self.layout.index, {10: 0, 20: 1, 30: 2})
+
+    def test_shifts(self):
+        self.assertEqual(self.layout.shifts((3, 18, 1)), (22, [19, 1, 0]))
+        self.assertEqual(self.layout.shifts((8, 0, 8)), (16, [8, 8, 0]))
+
+    def test_join(self):
+        value, widths = self.layout.join(self.segments)
+        self.assertEqual(widths, (3, 18, 1))
+        self.assertEqual(len(value), 22)
+        self.assertEqual(value, BitVector.concat(*self.segments))
+
+    def test_split(self):
+        value, widths = self.layout.join(self.segments)
+        captured = BitVector(~value.value, value.width)
+        expected = slice_walk(captured, widths)
+        for i in range(len(widths)):
+            part = self.layout.split(captured, widths, i)
+            self.assertEqual(len(part), widths[i])
+            self.assertEqual(part, expected[i])
+
+    @unittest.skipIf(packed.np is None, "NumPy is not installed")
+    def test_packed_join(self):
+        value, widths = self.layout.join(self.segments)
+        segments = [self.segments[0], PackedBitVector.of(self.segments[1]), self.segments[2]]
+        packed_value, packed_widths = self.layout.join(segments)
+        self.assertIsInstance(packed_value, PackedBitVector)
+        self.assertEqual(packed_widths, widths)
+        self.assertEqual((packed_value.value, packed_value.width), (value.value, value.width))
+        for i in range(len(widths)):
+            part = self.layout.split(packed_value, widths, i)
+            self.assertIsInstance(part, PackedBitVector)
+            self.assertEqual((part.value, part.width), (self.segments[i].value, widths[i]))
+
+    def test_eviction(self):
+        ChainLayout.max_layouts = 4
+        cache = self.layout._ChainLayout__shifts
+        for w in range(1, 11):
+            widths = (w, 18 - w, 1)
+            segments = [BitVector(2 ** w - 1, w), BitVector(0, 18 - w), BitVector(1, 1)]
+            value, joined = self.layout.join(segments)
+            self.assertEqual(joined, widths)
+            self.assertLessEqual(len(cache), ChainLayout.max_layouts)
+            self.assertIn(widths, cache)
+            # The offsets of an evicted width combination are computed again
+            self.assertEqual(value, BitVector.concat(*segments))
+            expected = slice_walk(value, widths)
+            self.assertEqual([self.layout.split(value, widths, i) for i in range(3)], expected)
+        self.assertNotIn((1, 17, 1), cache)
+        self.assertEqual(self.layout.shifts((1, 17, 1)), (19, [18, 1, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
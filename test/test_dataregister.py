@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the DataRegister.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the requests issued by the DataRegister class.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+
+from myhdl import intbv
+
+from p2654model.assembly.DataRegister import DataRegister
+from p2654model.description.DataRegisterDescription import DataRegisterDescription
+from p2654model.interface.Command import Command
+from p2654model.interface.PortalAccessInterface import PortalAccessInterface
+from p2654model.scheduler.Scheduler import Scheduler
+
+
+class DataRegisterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.ai = PortalAccessInterface()
+        self.ai.set_inline()
+        self.ai.set_req_callback(1, lambda rvf: self.requests.append((rvf.command, int(rvf.payload))))
+        self.dr = DataRegister("DR", DataRegister.Direction.READ_WRITE,
+                               DataRegisterDescription("DR", 8, intbv('00000000')))
+        self.dr.uid = 1
+        self.dr.scheduler = Scheduler()
+        self.dr.set_client_interface(self.ai)
+
+    def tearDown(self):
+        self.ai.close()
+
+    def test_refresh(self):
+        self.dr.refresh()
+        self.dr.apply()
+        self.assertEqual(self.requests, [(Command.READ, 0x00)])
+
+    def test_refresh_keeps_a_queued_write(self):
+        # As in write() followed by read_many() before the next apply
+        self.dr.write(intbv(0x5A)[8:])
+        self.dr.refresh()
+        self.dr.apply()
+        self.assertEqual(self.requests, [(Command.WRITE_READ, 0x5A)])
+        self.dr.refresh()
+        self.dr.apply()
+        self.assertEqual(self.requests[1], (Command.READ, 0x5A))
+
+
+if __name__ == '__main__':
+    unittest.main()
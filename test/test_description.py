@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the mux descriptions.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the uid index of the ScanMuxDescription and DataMuxDescription classes.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+from unittest import mock
+
+from p2654model.description.DataMuxDescription import DataMuxDescription
+from p2654model.description.ScanMuxDescription import ScanMuxDescription
+from p2654model.interface.BitVector import BitVector
+
+
+class Register:
+    '''
+    Only the uid of a register is used by the index of a description.
+    '''
+    def __init__(self, uid):
+        self.uid = uid
+
+
+class ScanMuxDescriptionTestCase(unittest.TestCase):
+    index = "_ScanMuxDescription__index_uids"
+
+    def setUp(self):
+        self.description = ScanMuxDescription("MUX", 2)
+
+    def add(self, code, register):
+        self.description.add_dr_register(code, "R{:d}".format(code), register)
+
+    def test_first_match(self):
+        a = Register(1)
+        self.add(0, a)
+        self.add(1, Register(2))
+        self.add(2, a)
+        self.assertEqual(self.description.get_first_match(1), BitVector(0, 2))
+        self.assertEqual(len(self.description.get_first_match(2)), 2)
+        self.assertEqual(self.description.get_first_match(2), 1)
+
+    def test_miss_does_not_rebuild(self):
+        self.add(0, Register(1))
+        counter = mock.Mock(wraps=getattr(self.description, self.index))
+        with mock.patch.object(self.description, self.index, counter):
+            for i in range(5):
+                self.assertIsNone(self.description.get_first_match(7))
+            self.assertEqual(self.description.get_first_match(1), 0)
+            self.assertEqual(counter.call_count, 1)
+            # Adding a register drops the index
+            self.add(1, Register(7))
+            self.assertEqual(self.description.get_first_match(7), 1)
+            self.assertEqual(counter.call_count, 2)
+
+
+class DataMuxDescriptionTestCase(ScanMuxDescriptionTestCase):
+    index = "_DataMuxDescription__index_uids"
+
+    def setUp(self):
+        self.description = DataMuxDescription("MUX", 2)
+
+    def add(self, code, register):
+        self.description.add_dr_register(code, register)
+
+
+if __name__ == '__main__':
+    unittest.main()
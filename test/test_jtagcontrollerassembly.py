@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the JTAGControllerAssembly scan coalescing.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the per-TAP coalescing of scans in the JTAGControllerAssembly class.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+
+from myhdl import intbv
+
+from p2654model.assembly.JTAGControllerAssembly import JTAGControllerAssembly
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.Command import Command
+from p2654model.interface.RVF import RVF
+
+
+class RecordingController:
+    def __init__(self):
+        self.scans = []
+
+    def scan_ir(self, count, tdi):
+        self.scans.append(("SIR", count, tdi))
+        return tdi
+
+    def scan_dr(self, count, tdi):
+        self.scans.append(("SDR", count, tdi))
+        return tdi
+
+
+class BufferController:
+    def __init__(self):
+        self.scans = []
+
+    def ba_scan_ir(self, tdi_vector, count):
+        self.scans.append(("SIR", count, bytes(tdi_vector)))
+        return bytearray(tdi_vector)
+
+    def ba_scan_dr(self, tdi_vector, count):
+        self.scans.append(("SDR", count, bytes(tdi_vector)))
+        return bytearray(tdi_vector)
+
+
+class RecordingInterface:
+    def __init__(self):
+        self.responses = []
+
+    def response(self, rvf: RVF):
+        self.responses.append((rvf.uid, rvf.command))
+        self.payload = rvf.payload
+
+
+class JTAGControllerAssemblyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.controller = RecordingController()
+        self.jc = JTAGControllerAssembly("JC1", "JTAG", self.controller)
+        self.jc.uid = 1
+        self.jc.host_interface = RecordingInterface()
+
+    def request(self, command, value, length):
+        rvf = RVF()
+        rvf.uid = 2
+        rvf.command = command
+        rvf.payload = intbv(value)[length:]
+        self.jc.hcb_handler(rvf)
+
+    def test_repeated_sirnc_is_dropped(self):
+        self.request(Command.SIRNC, 0, 8)
+        self.jc.apply()
+        self.request(Command.SIRNC, 0, 8)
+        self.jc.apply()
+        self.assertEqual(self.controller.scans, [("SIR", 8, "00")])
+        self.assertEqual(len(self.jc.host_interface.responses), 2)
+
+    def test_changed_sirnc_is_scanned(self):
+        self.request(Command.SIRNC, 0, 8)
+        self.request(Command.SIRNC, 2, 8)
+        self.jc.apply()
+        self.assertEqual(self.controller.scans, [("SIR", 8, "00"), ("SIR", 8, "02")])
+
+    def test_back_to_back_sdrnc_are_merged(self):
+        self.request(Command.SDRNC, 1, 18)
+        self.request(Command.SDRNC, 2, 18)
+        self.request(Command.SDR, 3, 18)
+        self.jc.apply()
+        self.assertEqual(self.controller.scans, [("SDR", 18, "00002"), ("SDR", 18, "00003")])
+        self.assertEqual(self.jc.host_interface.responses, [(2, Command.SDRNC), (2, Command.SDRNC), (2, Command.SDR)])
+
+    def test_buffer_scan(self):
+        self.jc.jtag_controller = BufferController()
+        self.request(Command.SDR, 0x2A5A5, 18)
+        self.jc.apply()
+        self.assertEqual(self.jc.jtag_controller.scans, [("SDR", 18, bytes([0xA5, 0xA5, 0x02]))])
+        self.assertEqual(self.jc.host_interface.payload, 0x2A5A5)
+        self.assertEqual(len(self.jc.host_interface.payload), 18)
+
+    def test_invalid_command(self):
+        for command in [None, "SIR", len(Command), -1]:
+            with self.assertRaises(SchedulerError):
+                self.request(command, 0, 8)
+        self.assertFalse(self.jc.pending)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the RVF messages.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the umids and the optional pool of the RVF class.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import threading
+import unittest
+
+from p2654model.interface.RVF import RVF
+
+
+class RVFPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        RVF.enable_pool(4)
+
+    def tearDown(self):
+        RVF.enable_pool(0)
+
+    @staticmethod
+    def message(uid=1):
+        rvf = RVF.acquire()
+        rvf.uid = uid
+        rvf.command = 0
+        rvf.payload = "payload"
+        return rvf
+
+    def test_disabled(self):
+        RVF.enable_pool(0)
+        rvf = self.message()
+        RVF.release(rvf)
+        self.assertIsNone(RVF.pool)
+        self.assertIsNot(RVF.acquire(), rvf)
+
+    def test_reuse(self):
+        rvf = self.message()
+        umid = rvf.umid
+        RVF.release(rvf)
+        self.assertEqual((rvf.uid, rvf.command, rvf.payload), (None, None, None))
+        again = RVF.acquire()
+        self.assertIs(again, rvf)
+        # A recycled message is a new message
+        self.assertGreater(again.umid, umid)
+        self.assertEqual(len(RVF.pool), 0)
+
+    def test_double_release(self):
+        rvf = self.message()
+        RVF.release(rvf)
+        RVF.release(rvf)
+        self.assertEqual(len(RVF.pool), 1)
+        first = RVF.acquire()
+        second = RVF.acquire()
+        self.assertIsNot(first, second)
+
+    def test_pool_size(self):
+        messages = [self.message() for i in range(6)]
+        for rvf in messages:
+            RVF.release(rvf)
+        self.assertEqual(len(RVF.pool), 4)
+
+    def test_unique_umids(self):
+        umids = []
+        mutex = threading.Lock()
+
+        def build():
+            local = []
+            for i in range(2000):
+                rvf = RVF.acquire()
+                local.append(rvf.umid)
+                RVF.release(rvf)
+            mutex.acquire()
+            umids.extend(local)
+            mutex.release()
+
+        threads = [threading.Thread(target=build) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(umids), 16000)
+        self.assertEqual(len(set(umids)), 16000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,816 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the Scheduler.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the Scheduler class, run against a simulated JTAG controller.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import asyncio
+import time
+import unittest
+from threading import Barrier, Lock, Thread
+
+from myhdl import intbv
+
+from p2654model.assembly.IJTAGNetwork import IJTAGNetwork
+from p2654model.assembly.JTAGNetwork import JTAGNetwork
+from p2654model.assembly.ScanRegister import ScanRegister
+from p2654model.description.IJTAGNetworkDescription import IJTAGNetworkDescription
+from p2654model.description.JTAGNetworkDescription import JTAGNetworkDescription
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.interface.JTAGAccessInterface import JTAGAccessInterface
+from p2654model.interface.RVF import RVF
+from p2654model.interface.SCANAccessInterface import SCANAccessInterface
+from p2654model.scheduler.Scheduler import Scheduler
+
+
+class SimulatedTAP:
+    '''
+    sn74abt8244a like device: 8 bit IR, BYPASS selected by 0xFF, an 18 bit BSR by 0x02 and 0x00.
+    '''
+    def __init__(self):
+        self.ir = 0xFF
+        self.bsr = 0
+
+    def dr_length(self):
+        return 1 if self.ir == 0xFF else 18
+
+    def shift_ir(self, tdi):
+        self.ir = tdi
+        return 0x01
+
+    def shift_dr(self, tdi):
+        if self.ir == 0xFF:
+            return 0
+        tdo = self.bsr
+        self.bsr = tdi
+        return tdo
+
+
+class SimulatedController:
+    '''
+    JTAG controller driving a chain of SimulatedTAP, the first one in the most significant bits.
+    Every scan is recorded as (kind, count, tdi).
+    '''
+    def __init__(self, taps=1):
+        self.taps = [SimulatedTAP() for i in range(taps)]
+        self.scans = []
+
+    def __shift(self, kind, count, tdi, lengths, shift):
+        self.scans.append((kind, count, int(tdi, 16)))
+        if count != sum(lengths):
+            raise ValueError("{:s} of {:d} bits on a chain of {:d} bits".format(kind, count, sum(lengths)))
+        tdo = 0
+        offset = count
+        for tap, length in zip(self.taps, lengths):
+            offset -= length
+            mask = (1 << length) - 1
+            tdo |= shift(tap, (int(tdi, 16) >> offset) & mask) << offset
+        return "{:0{w}X}".format(tdo, w=(count + 3) // 4)
+
+    def scan_ir(self, count, tdi):
+        return self.__shift("SIR", count, tdi, [8] * len(self.taps), SimulatedTAP.shift_ir)
+
+    def scan_dr(self, count, tdi):
+        return self.__shift("SDR", count, tdi, [t.dr_length() for t in self.taps], SimulatedTAP.shift_dr)
+
+
+def define_tap(topology, name):
+    ir = topology.defineScanRegister("IR", ScanRegister.Direction.READ_WRITE, "IR", 8, intbv('11111111'))
+    bypass = topology.defineScanRegister("BYPASS", ScanRegister.Direction.READ_WRITE, "BYPASS", 1, intbv('0'))
+    bsr = topology.defineScanRegister("BSR", ScanRegister.Direction.READ_WRITE, "BSR", 18,
+                                      intbv('000000000000000000'))
+    m1 = topology.defineScanMux("M1", "TAP_DRMUX", ir,
+                                [("BYPASS", intbv('11111111'), bypass), ("SAMPLE", intbv('00000010'), bsr),
+                                 ("EXTEST", intbv('00000000'), bsr)])
+    u1 = topology.defineTAP(name, "sn74abt8244a", ir, m1)
+    ai1 = SCANAccessInterface()
+    bypass.set_client_interface(ai1)
+    bsr.set_client_interface(ai1)
+    m1.set_host_interface(ai1)
+    ai2 = SCANAccessInterface()
+    ir.set_client_interface(ai2)
+    m1.set_client_interface(ai2)
+    u1.set_host_interface(ai2)
+    return u1
+
+
+def configure(scheduler, controller, taps=1, name="JC1"):
+    '''
+    Build JC1.U1 or, with several taps, JC1.U1 .. JC1.Un on a JTAGNetwork chain.
+    The JTAGControllerAssembly is the top of the topology or, if it already has one, another root.
+    Returns the JTAGControllerAssembly.
+    '''
+    topology = scheduler.topology
+    devices = [define_tap(topology, "U{:d}".format(i + 1)) for i in range(taps)]
+    if taps == 1:
+        top = devices[0]
+    else:
+        top = JTAGNetwork("NET", JTAGNetworkDescription("CHAIN"))
+        top.uid = 1000
+        ai = JTAGAccessInterface()
+        for u in devices:
+            top.append_assembly(u)
+            u.set_client_interface(ai)
+        top.set_host_interface(ai)
+    jc1 = topology.defineJTAGControllerAssembly(name, "JTAG", controller, top)
+    ai3 = JTAGAccessInterface()
+    top.set_client_interface(ai3)
+    jc1.set_host_interface(ai3)
+    if topology.top is None:
+        topology.top = jc1
+    else:
+        topology.addRoot(jc1)
+    return jc1
+
+
+class SchedulerTestCase(unittest.TestCase):
+    timeout = 10
+
+    def setUp(self):
+        self.controller = SimulatedController()
+        self.scheduler = Scheduler()
+        configure(self.scheduler, self.controller)
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def run_bounded(self, f, *args):
+        '''
+        Run f on a thread of its own and fail instead of hanging when the scheduler does not answer.
+        '''
+        result = []
+        t = Thread(target=lambda: result.append(f(*args)), daemon=True)
+        t.start()
+        t.join(self.timeout)
+        self.assertFalse(t.is_alive(), "scheduler did not complete the access")
+        self.assertEqual(len(result), 1, "the access raised an exception")
+        return result[0]
+
+
+class BatchedAccessTestCase(SchedulerTestCase):
+    def test_write_many_across_mux_switch(self):
+        s = self.scheduler
+        self.run_bounded(s.write_many, [("JC1.U1.IR", intbv('00000010')), ("JC1.U1.BSR", intbv(0x155)[18:])])
+        # The IR and the BSR meet at the TAP, so the BSR is scanned once the IR selects it
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x155)])
+        self.assertEqual(self.controller.taps[0].bsr, 0x155)
+
+    def test_write_many_retargets_the_mux(self):
+        s = self.scheduler
+        self.run_bounded(s.write_many, [("JC1.U1.BSR", intbv(0x2A)[18:])])
+        # BYPASS is selected at reset, the planner first writes the first code selecting the BSR
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x2A)])
+
+    def test_write_read_many_returns_captures(self):
+        s = self.scheduler
+        self.run_bounded(s.write_many, [("JC1.U1.BSR", intbv(7)[18:])])
+        captured = self.run_bounded(s.write_read_many, [("JC1.U1.BSR", intbv(9)[18:])])
+        self.assertEqual(list(captured.keys()), ["JC1.U1.BSR"])
+        self.assertEqual(captured["JC1.U1.BSR"], 7)
+        self.assertEqual(len(captured["JC1.U1.BSR"]), 18)
+
+    def test_read_many_rescans_the_value_held(self):
+        s = self.scheduler
+        self.run_bounded(s.write_many, [("JC1.U1.BSR", intbv(5)[18:])])
+        captured = self.run_bounded(s.read_many, ["JC1.U1.BSR", "JC1.U1.IR"])
+        self.assertEqual(captured, {"JC1.U1.BSR": 5, "JC1.U1.IR": 0x01})
+        self.assertEqual(self.controller.taps[0].bsr, 5)
+        self.assertEqual(self.controller.taps[0].ir, 0x02)
+
+    def test_registers_on_one_chain_share_a_scan(self):
+        self.scheduler.stop()
+        self.controller = SimulatedController(taps=2)
+        self.scheduler = Scheduler()
+        configure(self.scheduler, self.controller, taps=2)
+        self.scheduler.start()
+        s = self.scheduler
+        captured = self.run_bounded(s.write_read_many, [("JC1.U1.BSR", intbv(1)[18:]), ("JC1.U2.BSR", intbv(2)[18:])])
+        self.assertEqual(captured, {"JC1.U1.BSR": 0, "JC1.U2.BSR": 0})
+        # One IR scan selects both BSRs, one DR scan writes both of them
+        self.assertEqual(self.controller.scans, [("SIR", 16, 0x0202), ("SDR", 36, (1 << 18) | 2)])
+        self.assertEqual([t.bsr for t in self.controller.taps], [1, 2])
+
+
+class RetargetTestCase(SchedulerTestCase):
+    def test_single_write_retargets_the_mux(self):
+        s = self.scheduler
+
+        def write_bsr():
+            s.write("JC1.U1.BSR", intbv(0x155)[18:])
+            s.apply()
+
+        self.run_bounded(write_bsr)
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x155)])
+
+    def test_single_write_read_retargets_the_mux(self):
+        s = self.scheduler
+
+        def write_read_bsr():
+            s.write_read("JC1.U1.BSR", intbv(0x155)[18:])
+            s.apply()
+            return s.read("JC1.U1.BSR")
+
+        self.assertEqual(self.run_bounded(write_read_bsr), 0)
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x155)])
+
+    def test_selected_keyreg_is_not_rescanned(self):
+        s = self.scheduler
+
+        def write_bsr():
+            s.write("JC1.U1.IR", intbv('00000000'))
+            s.apply()
+            s.retarget(["JC1.U1.BSR"])
+            s.write("JC1.U1.BSR", intbv(0x2A)[18:])
+            s.apply()
+
+        self.run_bounded(write_bsr)
+        # EXTEST already selects the BSR, so the IR is left alone
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x00), ("SDR", 18, 0x2A)])
+
+    def test_pending_keyreg_is_flushed_first(self):
+        s = self.scheduler
+
+        def write_bsr():
+            s.write("JC1.U1.IR", intbv('00000000'))
+            s.write("JC1.U1.BSR", intbv(0x2A)[18:])
+            s.apply()
+
+        self.run_bounded(write_bsr)
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x00), ("SDR", 18, 0x2A)])
+
+    def test_write_before_start(self):
+        s = Scheduler()
+        controller = SimulatedController()
+        configure(s, controller)
+        try:
+            # The write is left to the scheduler thread instead of waiting for a cycle
+            self.run_bounded(s.write, "JC1.U1.BSR", intbv(0x155)[18:])
+            s.write("JC1.U1.BSR", intbv(0x2A)[18:])
+            self.assertEqual(controller.scans, [])
+            s.start()
+            self.run_bounded(s.apply)
+        finally:
+            s.stop()
+        # Accesses are made in call order, the value written last is scanned
+        self.assertEqual(controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x2A)])
+
+    def test_deferred_write_error(self):
+        s = self.scheduler
+        s.write("JC1.U1.BSR", intbv(0x15)[8:])
+        with self.assertRaises(SchedulerError):
+            s.apply()
+        # The scheduler thread survives the failed access
+        s.write("JC1.U1.BSR", intbv(0x155)[18:])
+        self.run_bounded(s.apply)
+        self.assertEqual(self.controller.taps[0].bsr, 0x155)
+
+    def test_plan_is_cached(self):
+        topology = self.scheduler.topology
+        retargeter = self.scheduler.retargeter
+        bsr = topology.getAssembly(topology.getAssemblyUID("JC1.U1.BSR"))
+        m1 = topology.getParent(bsr.uid)
+        plan = retargeter.plan([bsr])
+        self.assertEqual(plan, [[(m1, bsr)]])
+        self.assertIs(retargeter.plan([bsr]), plan)
+        retargeter.clear()
+        self.assertIsNot(retargeter.plan([bsr]), plan)
+        # The IR is on every scan path
+        self.assertEqual(retargeter.plan([m1.keyreg]), [])
+
+    def test_nested_mux_plan(self):
+        # U2.IR selects a network holding CTRL, the keyreg of M2, in series with M2 itself
+        topology = self.scheduler.topology
+        ir = topology.defineScanRegister("IR", ScanRegister.Direction.READ_WRITE, "IR", 8, intbv('11111111'))
+        bypass = topology.defineScanRegister("BYPASS", ScanRegister.Direction.READ_WRITE, "BYPASS", 1, intbv('0'))
+        ctrl = topology.defineScanRegister("CTRL", ScanRegister.Direction.READ_WRITE, "CTRL", 1, intbv('0'))
+        a = topology.defineScanRegister("A", ScanRegister.Direction.READ_WRITE, "A", 4, intbv('0000'))
+        b = topology.defineScanRegister("B", ScanRegister.Direction.READ_WRITE, "B", 4, intbv('0000'))
+        m2 = topology.defineScanMux("M2", "SIB_MUX", ctrl, [("A", intbv('0'), a), ("B", intbv('1'), b)])
+        net = IJTAGNetwork("NET", IJTAGNetworkDescription("NET"))
+        net.uid = 1000
+        net.append_assembly(ctrl)
+        net.append_assembly(m2)
+        m1 = topology.defineScanMux("M1", "TAP_DRMUX", ir,
+                                    [("BYPASS", intbv('11111111'), bypass), ("NET", intbv('00000100'), net)])
+        u2 = topology.defineTAP("U2", "sn74abt8244a", ir, m1)
+        topology.addRoot(topology.defineJTAGControllerAssembly("JC2", "JTAG", None, u2))
+        retargeter = self.scheduler.retargeter
+        # M1 has to select the network before CTRL can be written to select B
+        self.assertEqual(retargeter.plan([b]), [[(m1, net)], [(m2, b)]])
+        self.assertEqual(retargeter.plan([ctrl]), [[(m1, net)]])
+        with self.assertRaises(SchedulerError):
+            retargeter.plan([a, b])
+
+
+class ShadowTestCase(SchedulerTestCase):
+    def setUp(self):
+        SchedulerTestCase.setUp(self)
+        topology = self.scheduler.topology
+        self.ir = topology.getAssembly(topology.getAssemblyUID("JC1.U1.IR"))
+        self.bsr = topology.getAssembly(topology.getAssemblyUID("JC1.U1.BSR"))
+        self.ir.enable_shadow()
+        self.bsr.enable_shadow()
+        self.write("JC1.U1.IR", 0x02, 8)
+        self.write("JC1.U1.BSR", 0x155, 18)
+        del self.controller.scans[:]
+
+    def write(self, path, value, width):
+        self.scheduler.write(path, intbv(value)[width:])
+        self.run_bounded(self.scheduler.apply)
+
+    def test_repeated_write_is_dropped(self):
+        self.scheduler.write("JC1.U1.BSR", intbv(0x155)[18:])
+        self.assertFalse(self.bsr.is_pending())
+        self.assertEqual(self.scheduler.tot_pending_leaves, 0)
+        self.run_bounded(self.scheduler.apply)
+        self.assertEqual(self.controller.scans, [])
+
+    def test_changed_write_is_scanned(self):
+        self.write("JC1.U1.BSR", 0x2A, 18)
+        self.write("JC1.U1.BSR", 0x2A, 18)
+        self.assertEqual(self.controller.scans, [("SDR", 18, 0x2A)])
+
+    def test_write_read_is_scanned(self):
+        self.scheduler.write_read("JC1.U1.BSR", intbv(0x155)[18:])
+        self.run_bounded(self.scheduler.apply)
+        self.assertEqual(self.controller.scans, [("SDR", 18, 0x155)])
+
+    def test_refresh_resets_the_shadow(self):
+        self.run_bounded(self.scheduler.read_many, ["JC1.U1.BSR"])
+        self.write("JC1.U1.BSR", 0x155, 18)
+        self.assertEqual(self.controller.scans, [("SDR", 18, 0x155), ("SDR", 18, 0x155)])
+
+    def test_unknown_capture_resets_the_shadow(self):
+        rvf = RVF()
+        rvf.uid = self.bsr.uid
+        rvf.command = None
+        with self.assertRaises(SchedulerError):
+            self.bsr.resp_handler(rvf)
+        self.write("JC1.U1.BSR", 0x155, 18)
+        self.assertEqual(self.controller.scans, [("SDR", 18, 0x155)])
+
+    def test_mux_keyreg_write_is_dropped(self):
+        m1 = self.scheduler.topology.getParent(self.bsr.uid)
+        m1._deselect(self.bsr.uid)
+        self.assertTrue(self.ir.is_pending())
+        self.run_bounded(self.scheduler.apply)
+        # The IR already holds the code selecting BYPASS
+        m1._deselect(self.bsr.uid)
+        self.assertFalse(self.ir.is_pending())
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0xFF)])
+
+
+class AgingTestCase(SchedulerTestCase):
+    max_aging = 0
+    max_aging_us = 0
+
+    def setUp(self):
+        self.controller = SimulatedController()
+        self.scheduler = Scheduler(max_aging=self.max_aging, max_aging_us=self.max_aging_us)
+        configure(self.scheduler, self.controller)
+        self.scheduler.start()
+
+    def capture_bsr(self):
+        s = self.scheduler
+
+        def write_read_bsr():
+            s.write("JC1.U1.IR", intbv('00000000'))
+            s.apply()
+            s.write_read("JC1.U1.BSR", intbv(5)[18:])
+            s.apply()
+
+        self.run_bounded(write_read_bsr)
+        del self.controller.scans[:]
+
+    def next_cycle(self):
+        s = self.scheduler
+
+        def write_ir():
+            s.write("JC1.U1.IR", intbv('00000000'))
+            s.apply()
+
+        self.run_bounded(write_ir)
+
+
+class CycleAgingTestCase(AgingTestCase):
+    max_aging = 2
+
+    def test_read_within_max_aging_is_cached(self):
+        self.capture_bsr()
+        self.assertEqual(self.run_bounded(self.scheduler.read, "JC1.U1.BSR"), 0)
+        self.next_cycle()
+        self.assertEqual(self.run_bounded(self.scheduler.read, "JC1.U1.BSR"), 0)
+        # The IR write of the extra cycle is dropped by the controller, it already holds EXTEST
+        self.assertEqual(self.controller.scans, [])
+
+    def test_expired_read_is_refreshed(self):
+        self.capture_bsr()
+        self.next_cycle()
+        self.next_cycle()
+        del self.controller.scans[:]
+        # The BSR is rescanned with the value it holds, capturing that value
+        self.assertEqual(self.run_bounded(self.scheduler.read, "JC1.U1.BSR"), 5)
+        self.assertEqual(self.controller.scans, [("SDR", 18, 5)])
+        self.assertEqual(self.run_bounded(self.scheduler.read_many, ["JC1.U1.BSR"]), {"JC1.U1.BSR": 5})
+        self.assertEqual(len(self.controller.scans), 1)
+
+    def test_empty_cycles_are_not_counted(self):
+        self.capture_bsr()
+        cycles = self.scheduler.cycle_count
+        self.run_bounded(self.scheduler.apply)
+        self.run_bounded(self.scheduler.apply)
+        self.assertEqual(self.scheduler.cycle_count, cycles)
+        # Still within max_aging: no scan cycle ran since the capture
+        self.assertEqual(self.run_bounded(self.scheduler.read, "JC1.U1.BSR"), 0)
+        self.assertEqual(self.controller.scans, [])
+
+    def test_read_stamp(self):
+        before = time.monotonic()
+        self.capture_bsr()
+        cycles = self.scheduler.cycle_count
+        value, timestamp, cycle = self.run_bounded(lambda: self.scheduler.read("JC1.U1.BSR", stamp=True))
+        self.assertEqual((value, cycle), (0, cycles))
+        self.assertGreaterEqual(timestamp, before)
+        self.next_cycle()
+        self.next_cycle()
+        captured = self.run_bounded(lambda: self.scheduler.read_many(["JC1.U1.BSR"], stamp=True))
+        value, timestamp, cycle = captured["JC1.U1.BSR"]
+        self.assertEqual((value, cycle), (5, cycles + 3))
+
+
+class TimeAgingTestCase(AgingTestCase):
+    max_aging_us = 100000
+
+    def test_read_within_max_aging_is_cached(self):
+        self.capture_bsr()
+        self.assertEqual(self.run_bounded(self.scheduler.read, "JC1.U1.BSR"), 0)
+        self.assertEqual(self.controller.scans, [])
+
+    def test_expired_read_is_refreshed(self):
+        self.capture_bsr()
+        time.sleep(0.15)
+        self.assertEqual(self.run_bounded(self.scheduler.read, "JC1.U1.BSR"), 5)
+        self.assertEqual(self.controller.scans, [("SDR", 18, 5)])
+
+
+class SlowController(SimulatedController):
+    def scan_dr(self, count, tdi):
+        time.sleep(0.05)
+        return SimulatedController.scan_dr(self, count, tdi)
+
+
+class AutoFlushTestCase(SchedulerTestCase):
+    def start(self, controller, taps=1, **scheduler_args):
+        self.controller = controller
+        self.scheduler = Scheduler(auto_flush=True, **scheduler_args)
+        configure(self.scheduler, controller, taps=taps)
+        self.scheduler.start()
+
+    def setUp(self):
+        self.scheduler = None
+
+    def tearDown(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+    def wait_for_scans(self, count):
+        deadline = time.monotonic() + self.timeout
+        while len(self.controller.scans) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        scans = list(self.controller.scans)
+        # Let the flushed cycle complete before the scheduler is stopped
+        self.run_bounded(self.scheduler.apply)
+        return scans
+
+    def test_threshold_flush(self):
+        self.start(SimulatedController(taps=2), taps=2, flush_threshold=2)
+        self.scheduler.write("JC1.U1.IR", intbv('00000010'))
+        time.sleep(0.05)
+        self.assertEqual(self.controller.scans, [])
+        # The second write fills the batch, no apply() is needed
+        self.scheduler.write("JC1.U2.IR", intbv('00000000'))
+        self.assertEqual(self.wait_for_scans(1), [("SIR", 16, 0x0200)])
+
+    def test_deadline_flush(self):
+        self.start(SimulatedController(), watchdog_us=50000)
+        self.scheduler.write("JC1.U1.IR", intbv('00000010'))
+        self.assertEqual(self.wait_for_scans(1), [("SIR", 8, 0x02)])
+
+    def test_apply_waits_for_its_cycle(self):
+        # The scan outlasts the watchdog, apply() must not give up on it
+        self.start(SlowController(), watchdog_us=1000)
+        s = self.scheduler
+
+        def write_read_bsr():
+            s.write_read("JC1.U1.BSR", intbv(0x155)[18:])
+            s.apply()
+            return s.read("JC1.U1.BSR")
+
+        self.assertEqual(self.run_bounded(write_read_bsr), 0)
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x155)])
+
+
+class DirtyPathTestCase(SchedulerTestCase):
+    def setUp(self):
+        self.controller = SimulatedController(taps=2)
+        self.scheduler = Scheduler()
+        configure(self.scheduler, self.controller, taps=2)
+        self.scheduler.start()
+
+    def count_applies(self, path):
+        '''
+        Count the apply() calls of every assembly below path.
+        '''
+        topology = self.scheduler.topology
+        counts = {}
+
+        def counting(a):
+            apply = a.apply
+
+            def f():
+                counts[a.name] = counts.get(a.name, 0) + 1
+                apply()
+            return f
+
+        a = topology.getAssembly(topology.getAssemblyUID(path))
+        pending = [a]
+        while len(pending) > 0:
+            a = pending.pop()
+            a.apply = counting(a)
+            s = a.depth()
+            while s is not None:
+                pending.append(s)
+                s = s.breadth()
+        return counts
+
+    def test_only_dirty_paths_are_visited(self):
+        s = self.scheduler
+        u1 = self.count_applies("JC1.U1")
+        u2 = self.count_applies("JC1.U2")
+        s.write("JC1.U2.IR", intbv('00000010'))
+        self.run_bounded(s.apply)
+        self.assertEqual(u1, {})
+        # The TAP is visited again once the request of the IR reaches it, its mux never is
+        self.assertEqual(set(u2.keys()), {"U2", "IR"})
+        self.assertEqual(self.controller.scans, [("SIR", 16, 0xFF02)])
+
+    def test_idle_tap_follows_its_ir(self):
+        s = self.scheduler
+        # The mux of U1 selects BYPASS when it is last visited
+        s.write("JC1.U1.BYPASS", intbv('1'))
+        self.run_bounded(s.apply)
+        s.write("JC1.U1.IR", intbv('00000010'))
+        s.write("JC1.U2.IR", intbv('00000010'))
+        self.run_bounded(s.apply)
+        # The mux of U1 is not visited again: U1 shifts the BSR its IR selects, not BYPASS
+        s.write("JC1.U2.BSR", intbv(0x155)[18:])
+        self.run_bounded(s.apply)
+        self.assertEqual(self.controller.scans, [("SDR", 2, 0x2), ("SIR", 16, 0x0202), ("SDR", 36, 0x155)])
+        self.assertEqual(self.controller.taps[1].bsr, 0x155)
+
+    def test_pending_paths(self):
+        s = self.scheduler
+        topology = s.topology
+        bsr = topology.getAssemblyUID("JC1.U2.BSR")
+        path = s._pending_paths({bsr})
+        self.assertEqual(path, {bsr} | {a.uid for a in topology.getAncestors(bsr)})
+        self.assertNotIn(topology.getAssemblyUID("JC1.U1"), path)
+        # An assembly unknown to the registry makes the cycle visit the whole tree
+        self.assertIsNone(s._pending_paths({bsr, 9999}))
+
+
+class RendezvousController(SimulatedController):
+    '''
+    Every IR scan waits for the IR scan of the other controller sharing the barrier.
+    '''
+    def __init__(self, barrier):
+        SimulatedController.__init__(self)
+        self.barrier = barrier
+
+    def scan_ir(self, count, tdi):
+        self.barrier.wait()
+        return SimulatedController.scan_ir(self, count, tdi)
+
+
+class OverlapController(SimulatedController):
+    '''
+    Records the largest number of scans in progress at once.
+    '''
+    def __init__(self):
+        SimulatedController.__init__(self)
+        self.mutex = Lock()
+        self.active = 0
+        self.overlap = 0
+
+    def scan_ir(self, count, tdi):
+        self.mutex.acquire()
+        self.active += 1
+        self.overlap = max(self.overlap, self.active)
+        self.mutex.release()
+        time.sleep(0.05)
+        tdo = SimulatedController.scan_ir(self, count, tdi)
+        self.mutex.acquire()
+        self.active -= 1
+        self.mutex.release()
+        return tdo
+
+
+class ControllerRootsTestCase(SchedulerTestCase):
+    def setUp(self):
+        self.scheduler = Scheduler()
+
+    def start_inline(self):
+        # Inline interfaces carry the requests down to the controllers within the apply() of
+        # their root, so both scans are issued by the same cycle
+        for ai in self.scheduler.topology.getInterfaces():
+            ai.set_inline()
+        self.scheduler.start()
+
+    def test_controllers_are_applied_concurrently(self):
+        # Each scan waits for the other one, so a serialized apply breaks the barrier
+        barrier = Barrier(2, timeout=5)
+        controllers = [RendezvousController(barrier), RendezvousController(barrier)]
+        configure(self.scheduler, controllers[0], name="JC1")
+        configure(self.scheduler, controllers[1], name="JC2")
+        self.assertEqual([r.name for r in self.scheduler.topology.getRoots()], ["JC1", "JC2"])
+        self.start_inline()
+        self.run_bounded(self.scheduler.write_many, [("JC1.U1.IR", intbv('00000010')),
+                                                     ("JC2.U1.IR", intbv('00000000'))])
+        self.assertFalse(barrier.broken)
+        self.assertEqual([c.taps[0].ir for c in controllers], [0x02, 0x00])
+
+    def test_shared_controller_is_serialized(self):
+        controller = OverlapController()
+        configure(self.scheduler, controller, name="JC1")
+        configure(self.scheduler, controller, name="JC2")
+        self.start_inline()
+        self.run_bounded(self.scheduler.write_many, [("JC1.U1.IR", intbv('00000010')),
+                                                     ("JC2.U1.IR", intbv('00000000'))])
+        self.assertEqual(controller.overlap, 1)
+        self.assertEqual(controller.scans, [("SIR", 8, 0x02), ("SIR", 8, 0x00)])
+
+    def test_shared_controller_ir(self):
+        # Both roots shift the same IR, a value cached by JC1 is overwritten by the scan of JC2
+        controller = SimulatedController()
+        configure(self.scheduler, controller, name="JC1")
+        configure(self.scheduler, controller, name="JC2")
+        self.scheduler.start()
+        for path, value in [("JC1.U1.IR", 0x02), ("JC2.U1.IR", 0x00), ("JC1.U1.IR", 0x02)]:
+            self.scheduler.write(path, intbv(value)[8:])
+            self.run_bounded(self.scheduler.apply)
+        self.assertEqual(controller.scans, [("SIR", 8, 0x02), ("SIR", 8, 0x00), ("SIR", 8, 0x02)])
+        self.assertEqual(controller.taps[0].ir, 0x02)
+
+    def test_duplicate_root(self):
+        configure(self.scheduler, SimulatedController(), name="JC1")
+        with self.assertRaises(SchedulerError):
+            configure(self.scheduler, SimulatedController(), name="JC1")
+
+
+class AsyncAccessTestCase(SchedulerTestCase):
+    def test_sync_apply_after_aapply(self):
+        s = self.scheduler
+
+        async def select_bsr():
+            await s.awrite_read("JC1.U1.IR", intbv('00000010'))
+            await s.aapply()
+            return await s.aread("JC1.U1.IR")
+
+        self.assertEqual(self.run_bounded(asyncio.run, select_bsr()), 0x01)
+
+        def write_read_bsr():
+            # apply() must wait for its own cycle, not return on the end of the aapply() one
+            s.write_read("JC1.U1.BSR", intbv(0x155)[18:])
+            s.apply()
+            return s.read("JC1.U1.BSR")
+
+        self.assertEqual(self.run_bounded(write_read_bsr), 0)
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x155)])
+
+    def test_closed_loop_waiter(self):
+        s = self.scheduler
+
+        async def give_up():
+            try:
+                await asyncio.wait_for(s.aapply(), 0)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(give_up())
+        # An aapply() whose loop was closed before the cycle completed its future
+        loop = asyncio.new_event_loop()
+        s._add_apply_waiter(loop, loop.create_future())
+        loop.close()
+        s.write("JC1.U1.IR", intbv('00000010'))
+        self.run_bounded(s.apply)
+        s.write("JC1.U1.IR", intbv('00000000'))
+        self.run_bounded(s.apply)
+        self.assertEqual(self.controller.taps[0].ir, 0x00)
+
+    def test_concurrent_aapply(self):
+        s = self.scheduler
+
+        async def access(path, value):
+            await s.awrite_read(path, value)
+            await s.aapply()
+            return await s.aread(path)
+
+        async def both():
+            return await asyncio.gather(access("JC1.U1.IR", intbv('00000000')), s.aapply())
+
+        self.assertEqual(self.run_bounded(asyncio.run, both())[0], 0x01)
+        self.assertEqual(self.controller.taps[0].ir, 0x00)
+
+
+class NetworkTAP(SimulatedTAP):
+    '''
+    SimulatedTAP selecting an 8 bit network of two 4 bit registers with the 0x04 instruction.
+    '''
+    def dr_length(self):
+        return 8 if self.ir == 0x04 else SimulatedTAP.dr_length(self)
+
+
+class IJTAGNetworkTestCase(SchedulerTestCase):
+    def setUp(self):
+        self.controller = SimulatedController()
+        self.controller.taps = [NetworkTAP()]
+        self.scheduler = Scheduler()
+        topology = self.scheduler.topology
+        ir = topology.defineScanRegister("IR", ScanRegister.Direction.READ_WRITE, "IR", 8, intbv('11111111'))
+        bypass = topology.defineScanRegister("BYPASS", ScanRegister.Direction.READ_WRITE, "BYPASS", 1, intbv('0'))
+        a = topology.defineScanRegister("A", ScanRegister.Direction.READ_WRITE, "A", 4, intbv('0000'))
+        b = topology.defineScanRegister("B", ScanRegister.Direction.READ_WRITE, "B", 4, intbv('0000'))
+        net = IJTAGNetwork("NET", IJTAGNetworkDescription("NET"))
+        net.uid = 1000
+        net.append_assembly(a)
+        net.append_assembly(b)
+        ai0 = SCANAccessInterface()
+        a.set_client_interface(ai0)
+        b.set_client_interface(ai0)
+        net.set_host_interface(ai0)
+        m1 = topology.defineScanMux("M1", "TAP_DRMUX", ir,
+                                    [("BYPASS", intbv('11111111'), bypass), ("NET", intbv('00000100'), net)])
+        u1 = topology.defineTAP("U1", "sn74abt8244a", ir, m1)
+        ai1 = SCANAccessInterface()
+        bypass.set_client_interface(ai1)
+        net.set_client_interface(ai1)
+        m1.set_host_interface(ai1)
+        ai2 = SCANAccessInterface()
+        ir.set_client_interface(ai2)
+        m1.set_client_interface(ai2)
+        u1.set_host_interface(ai2)
+        topology.top = topology.defineJTAGControllerAssembly("JC1", "JTAG", self.controller, u1)
+        ai3 = JTAGAccessInterface()
+        u1.set_client_interface(ai3)
+        topology.top.set_host_interface(ai3)
+        self.scheduler.start()
+
+    def test_network_scan(self):
+        s = self.scheduler
+
+        def access():
+            s.write_read("JC1.U1.A", intbv(0x5)[4:])
+            s.write_read("JC1.U1.B", intbv(0xA)[4:])
+            s.apply()
+            # A is not requested and shifts the value it holds
+            s.write_read("JC1.U1.B", intbv(0x3)[4:])
+            s.apply()
+            return int(s.read("JC1.U1.A")), int(s.read("JC1.U1.B"))
+
+        self.assertEqual(self.run_bounded(access), (0x0, 0xA))
+        # The first register of the network occupies the most significant bits
+        self.assertEqual(self.controller.scans, [("SIR", 8, 0x04), ("SDR", 8, 0x5A), ("SDR", 8, 0x53)])
+        self.assertEqual(self.controller.taps[0].bsr, 0x53)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the SiteSupervisor.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the SiteSupervisor class, run against simulated JTAG controllers.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+
+from myhdl import intbv
+
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.scheduler.SiteSupervisor import SiteSupervisor
+from test.test_scheduler import SimulatedController, configure
+
+
+def site_controller(site):
+    '''
+    A site is the value held by the BSR of its board, None for a board that cannot be reached.
+    The workers import this module, so the factory and the controller must stay at module level.
+    '''
+    if site is None:
+        raise SchedulerError("No board on this site.")
+    controller = SimulatedController()
+    controller.taps[0].bsr = site
+    return controller, None
+
+
+class SiteSupervisorTestCase(unittest.TestCase):
+    script = [("write", "JC1.U1.IR", intbv(0x02)[8:]), ("apply",),
+              ("write_read", "JC1.U1.BSR", intbv(0x155)[18:]), ("apply",),
+              ("read", "JC1.U1.BSR", 18), ("read", "JC1.U1.BSR", 4)]
+
+    def test_sites(self):
+        supervisor = SiteSupervisor([0x2A5A5, 7, 0x3FFFF], configure, controller_factory=site_controller)
+        results = supervisor.run(self.script)
+        self.assertEqual(supervisor.errors, {})
+        self.assertEqual(results, [[0x2A5A5, 0x5], [7, 0x7], [0x3FFFF, 0xF]])
+        self.assertEqual([len(v) for v in results[0]], [18, 4])
+
+    def test_failing_site(self):
+        supervisor = SiteSupervisor([5, None], configure, controller_factory=site_controller, processes=1)
+        results = supervisor.run(self.script)
+        self.assertEqual(results[0], [5, 0x5])
+        self.assertIsNone(results[1])
+        self.assertEqual(list(supervisor.errors.keys()), [1])
+        self.assertIn("No board on this site.", supervisor.errors[1])
+
+    def test_read_without_width(self):
+        supervisor = SiteSupervisor([0], configure, controller_factory=site_controller)
+        with self.assertRaises(SchedulerError):
+            supervisor.run([("apply",), ("read", "JC1.U1.BSR")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+    Unit test cases for the Topology registry.
+    Copyright (C) 2020  Bradford G. Van Treuren
+
+    Unit test cases for the uid and path registry of the Topology class.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2020, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2020/10/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import unittest
+from threading import Thread
+
+from myhdl import intbv
+
+from p2654model.assembly.ScanRegister import ScanRegister
+from p2654model.error.SchedulerError import SchedulerError
+from p2654model.scheduler.Scheduler import Scheduler
+from p2654model.topology.Topology import Topology
+from test.test_scheduler import SimulatedController, configure
+
+
+class TopologyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.topology = Topology()
+        topology = self.topology
+        self.ir = topology.defineScanRegister("IR", ScanRegister.Direction.READ_WRITE, "IR", 8, intbv('11111111'))
+        self.bypass = topology.defineScanRegister("BYPASS", ScanRegister.Direction.READ_WRITE, "BYPASS", 1, intbv('0'))
+        self.bsr = topology.defineScanRegister("BSR", ScanRegister.Direction.READ_WRITE, "BSR", 18,
+                                               intbv('000000000000000000'))
+        self.m1 = topology.defineScanMux("M1", "TAP_DRMUX", self.ir,
+                                         [("BYPASS", intbv('11111111'), self.bypass),
+                                          ("SAMPLE", intbv('00000010'), self.bsr),
+                                          ("EXTEST", intbv('00000000'), self.bsr)])
+        self.u1 = topology.defineTAP("U1", "sn74abt8244a", self.ir, self.m1)
+        self.jc1 = topology.defineJTAGControllerAssembly("JC1", "JTAG", None, self.u1)
+        topology.top = self.jc1
+
+    def test_path_to_uid(self):
+        self.assertEqual(self.topology.getAssemblyUID("JC1"), self.jc1.uid)
+        self.assertEqual(self.topology.getAssemblyUID("JC1.U1"), self.u1.uid)
+        self.assertEqual(self.topology.getAssemblyUID("JC1.U1.IR"), self.ir.uid)
+        # M1 is hidden so its children are addressed through the TAP
+        self.assertEqual(self.topology.getAssemblyUID("JC1.U1.BSR"), self.bsr.uid)
+        self.assertEqual(self.topology.getAssemblyUID("JC1.U1.BYPASS"), self.bypass.uid)
+
+    def test_uid_to_assembly(self):
+        for a in [self.ir, self.bypass, self.bsr, self.m1, self.u1, self.jc1]:
+            self.assertIs(self.topology.getAssembly(a.uid), a)
+
+    def test_uid_to_path(self):
+        self.assertEqual(self.topology.getAssemblyPath(self.bsr.uid), "JC1.U1.BSR")
+        self.assertEqual(self.topology.getAssemblyPath(self.u1.uid), "JC1.U1")
+
+    def test_unknown_path(self):
+        with self.assertRaises(SchedulerError):
+            self.topology.getAssemblyUID("JC1.U1.NOPE")
+
+    def test_mux_codes(self):
+        description = self.m1.description
+        self.assertEqual(description.get_default_code(), 0xFF)
+        # BSR is selected by SAMPLE and EXTEST, the first one added wins
+        self.assertEqual(description.get_first_match(self.bsr.uid), 0x02)
+        self.assertEqual(len(description.get_first_match(self.bsr.uid)), 8)
+        self.assertIs(description.get_ir_dr(intbv('00000000')), self.bsr)
+        self.assertEqual(description.get_drs(), {self.bypass, self.bsr})
+        with self.assertRaises(SchedulerError):
+            description.get_ir_dr(0x55)
+
+    def test_scheduler_binding(self):
+        # Every scheduler owns its topology and the assemblies registered with it
+        s1 = Scheduler()
+        s2 = Scheduler()
+        r1 = s1.topology.defineScanRegister("R", ScanRegister.Direction.READ_WRITE, "R", 4, intbv('0000'))
+        r2 = s2.topology.defineScanRegister("R", ScanRegister.Direction.READ_WRITE, "R", 4, intbv('0000'))
+        self.assertIs(r1.get_scheduler(), s1)
+        self.assertIs(r2.get_scheduler(), s2)
+        for a in [self.ir, self.m1, self.u1, self.jc1]:
+            self.assertIsNone(a.scheduler)
+
+    def test_independent_lifecycles(self):
+        # Stopping a scheduler must not stop the dispatcher serving one built next to it
+        controllers = [SimulatedController(), SimulatedController()]
+        schedulers = [Scheduler(), Scheduler()]
+        for s, c in zip(schedulers, controllers):
+            configure(s, c)
+        for s, c in zip(schedulers, controllers):
+            s.start()
+
+            def write_bsr():
+                s.write("JC1.U1.BSR", intbv(0x155)[18:])
+                s.apply()
+
+            t = Thread(target=write_bsr, daemon=True)
+            t.start()
+            t.join(10)
+            self.assertFalse(t.is_alive(), "scheduler did not complete the access")
+            s.stop()
+            self.assertEqual(c.scans, [("SIR", 8, 0x02), ("SDR", 18, 0x155)])
+
+
+if __name__ == '__main__':
+    unittest.main()